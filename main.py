@@ -1,21 +1,32 @@
-import win32gui
-import win32con
 import os
-import requests
-import tempfile
-import shutil
-import subprocess
 import time
+_MODULE_STARTED = time.perf_counter()
 import re
-import winreg
+import json
+import random
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import messagebox
+from tkinter import font as tkfont
 from datetime import datetime
+from collections import namedtuple, deque
+import bisect
 import threading
-import mimetypes
+import queue
+import sqlite3
+import hashlib
 import math
 import sys
 
+try:
+    import win32gui
+    import win32con
+    import winreg
+except ImportError:
+    # 윈도우가 아닌 환경에서는 FakeWindowBackend로만 감시 로직을 실행할 수 있음
+    win32gui = None
+    win32con = None
+    winreg = None
+
 
 REPO = "banatic/CoolMessenger_download_helper"
 TARGET_WINDOW_TITLE = ["메시지 관리함", "개의 안읽은 메시지"]
@@ -69,7 +80,752 @@ def get_down_path():
         print(f"Error: {e}")
         return os.path.join(os.path.expanduser("~"), "Downloads")
 
-DOWNLOAD_PATH = get_down_path()
+_download_path = None
+
+def get_download_path():
+    """쿨메신저 다운로드 폴더 (처음 필요할 때 레지스트리에서 한 번만 읽음)"""
+    global _download_path
+    if _download_path is None:
+        _download_path = get_down_path()
+    return _download_path
+
+class DownloadIndex:
+    """다운로드 폴더 인덱스 (파일명 -> (크기, 수정 시각))
+
+    처음에 인덱스 스레드에서 os.scandir로 한 번 읽고, 이후에는 폴더 변경 알림(ReadDirectoryChangesW)으로
+    바뀐 파일만 갱신함. 알림을 쓸 수 없으면 poll_interval마다 폴더를 다시 읽음
+    get/exists/names는 첫 읽기가 끝날 때까지 (최대 ready_timeout초) 기다림 - 빈 인덱스를 보고
+    이미 받은 파일을 다시 받지 않도록. 기다리면 안 되는 UI 스레드는 ready로 먼저 확인함
+    변경된 파일명 목록은 add_listener로 등록한 콜백에 전달됨 (인덱스 스레드에서 호출)
+    """
+
+    FILE_LIST_DIRECTORY = 0x0001
+
+    def __init__(self, path, poll_interval=2.0, ready_timeout=30.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.ready_timeout = ready_timeout
+        self.scans = 0
+        self.notifications = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._listeners = []
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self):
+        """첫 폴더 읽기가 끝났는지"""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(self.ready_timeout if timeout is None else timeout)
+
+    def stop(self):
+        self._stopped = True
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def get(self, filename):
+        """(크기, 수정 시각) 또는 None"""
+        self.wait_ready()
+        return self._entries.get(os.path.normcase(filename))
+
+    def exists(self, filename):
+        self.wait_ready()
+        return os.path.normcase(filename) in self._entries
+
+    def names(self):
+        """인덱스에 있는 파일명 목록 (normcase 적용됨)"""
+        self.wait_ready()
+        return list(self._entries)
+
+    def scan(self):
+        """폴더 전체를 다시 읽고 바뀐 파일을 알림"""
+        entries = {}
+        try:
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            st = entry.stat()
+                            entries[os.path.normcase(entry.name)] = (entry.name, st.st_size, st.st_mtime)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"다운로드 폴더 읽기 실패: {e}")
+        with self._lock:
+            old = self._entries
+            self._entries = {key: (size, mtime) for key, (_, size, mtime) in entries.items()}
+        self.scans += 1
+        # 리스너가 get()을 부르므로 알리기 전에 표시 (읽기에 실패해도 기다리는 쪽이 멈추지 않도록)
+        self._ready.set()
+        changed = [name for key, (name, size, mtime) in entries.items() if old.get(key) != (size, mtime)]
+        changed += [key for key in old if key not in entries]
+        self._notify(changed)
+
+    def refresh(self, filenames):
+        """지정한 파일만 다시 확인하고 바뀐 파일을 알림"""
+        changed = []
+        for filename in filenames:
+            key = os.path.normcase(filename)
+            try:
+                st = os.stat(os.path.join(self.path, filename))
+                value = (st.st_size, st.st_mtime)
+            except OSError:
+                value = None
+            with self._lock:
+                if value is None:
+                    if self._entries.pop(key, None) is None:
+                        continue
+                elif self._entries.get(key) == value:
+                    continue
+                else:
+                    self._entries[key] = value
+            changed.append(filename)
+        self._notify(changed)
+
+    def _notify(self, changed):
+        if not changed:
+            return
+        for callback in self._listeners:
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"다운로드 폴더 알림 처리 오류: {e}")
+
+    def _watch(self):
+        self.scan()
+        try:
+            self._watch_changes()
+        except Exception as e:
+            log(f"폴더 변경 알림 사용 불가, 폴링으로 전환: {e}")
+        while not self._stopped:
+            time.sleep(self.poll_interval)
+            self.scan()
+
+    def _watch_changes(self):
+        import win32file
+
+        handle = win32file.CreateFile(
+            self.path,
+            self.FILE_LIST_DIRECTORY,
+            win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE | win32con.FILE_SHARE_DELETE,
+            None,
+            win32con.OPEN_EXISTING,
+            win32con.FILE_FLAG_BACKUP_SEMANTICS,
+            None
+        )
+        flags = (win32con.FILE_NOTIFY_CHANGE_FILE_NAME |
+                 win32con.FILE_NOTIFY_CHANGE_SIZE |
+                 win32con.FILE_NOTIFY_CHANGE_LAST_WRITE)
+        try:
+            while not self._stopped:
+                results = win32file.ReadDirectoryChangesW(handle, 65536, False, flags, None, None)
+                self.notifications += 1
+                if not results:
+                    # 알림 버퍼가 넘침 - 전체 다시 읽기
+                    self.scan()
+                    continue
+                self.refresh(list(dict.fromkeys(name for _, name in results)))
+        finally:
+            handle.Close()
+
+
+_download_index = None
+# 다운로드 폴더 관련 싱글턴은 Tk 스레드와 감시 스레드가 처음 쓰는 순간이 겹칠 수 있으므로 잠금 안에서 만듦
+_singleton_lock = threading.RLock()
+
+def get_download_index():
+    global _download_index
+    with _singleton_lock:
+        if _download_index is None:
+            index = DownloadIndex(get_download_path())
+            index.start()
+            _download_index = index
+    return _download_index
+
+def get_app_data_dir():
+    """설정/기록 파일을 저장할 폴더 (%APPDATA%\\CoolMessengerHelper)"""
+    base = os.environ.get("APPDATA") or os.path.join(os.path.expanduser("~"), ".config")
+    path = os.path.join(base, "CoolMessengerHelper")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class AttachmentHistory:
+    """지금까지 본 첨부파일 기록 (SQLite)
+
+    record()는 큐에 넣기만 하고 전용 스레드가 모아서 한 트랜잭션으로 기록함
+    검색은 FTS5 trigram 인덱스(부분 문자열 일치, 한글 단어 중간도 찾음)를 쓰고,
+    3글자 미만 검색어가 있거나 FTS5/trigram을 쓸 수 없으면 LIKE 검색을 사용함
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS attachments (
+            id INTEGER PRIMARY KEY,
+            filename TEXT NOT NULL,
+            size_text TEXT NOT NULL DEFAULT '',
+            window_title TEXT NOT NULL DEFAULT '',
+            first_seen REAL NOT NULL,
+            download_path TEXT NOT NULL DEFAULT '',
+            UNIQUE (filename, size_text, window_title)
+        );
+        CREATE INDEX IF NOT EXISTS attachments_filename ON attachments (filename COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS attachments_first_seen ON attachments (first_seen);
+    """
+    FTS_SCHEMA = """
+        DROP TRIGGER IF EXISTS attachments_ai;
+        DROP TRIGGER IF EXISTS attachments_ad;
+        DROP TABLE IF EXISTS attachments_fts;
+        CREATE VIRTUAL TABLE IF NOT EXISTS attachments_trgm USING fts5(
+            filename, window_title, content='attachments', content_rowid='id', tokenize='trigram'
+        );
+        CREATE TRIGGER IF NOT EXISTS attachments_trgm_ai AFTER INSERT ON attachments BEGIN
+            INSERT INTO attachments_trgm (rowid, filename, window_title)
+            VALUES (new.id, new.filename, new.window_title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS attachments_trgm_ad AFTER DELETE ON attachments BEGIN
+            INSERT INTO attachments_trgm (attachments_trgm, rowid, filename, window_title)
+            VALUES ('delete', old.id, old.filename, old.window_title);
+        END;
+    """
+    # trigram 토크나이저는 3글자 단위로 색인하므로 더 짧은 검색어는 FTS로 찾을 수 없음
+    FTS_MIN_TERM = 3
+
+    def __init__(self, path=None, batch_size=200, flush_interval=0.5):
+        self.path = path or os.path.join(get_app_data_dir(), "history.db")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._thread = None
+
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        created = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'attachments_trgm'").fetchone()
+        try:
+            conn.executescript(self.FTS_SCHEMA)
+            if created:
+                # 예전 unicode61 색인(attachments_fts)에서 옮겨 오는 경우 기존 기록으로 색인을 다시 만듦
+                conn.execute("INSERT INTO attachments_trgm (attachments_trgm) VALUES ('rebuild')")
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            # trigram 토크나이저는 SQLite 3.34 이상에서만 지원됨
+            print(f"FTS5 trigram 사용 불가, LIKE 검색으로 대체: {e}")
+            self.fts = False
+        conn.commit()
+
+    def _connect(self):
+        """스레드별 연결 (WAL 모드로 검색과 기록이 서로 막지 않음)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def start(self):
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def record(self, filename, size_text="", window_title="", download_path="", seen_at=None):
+        """첨부파일 기록 요청 (호출 스레드를 막지 않음)"""
+        self._queue.put((filename, size_text or "", window_title or "", seen_at or time.time(),
+                         download_path or ""))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                print(f"첨부파일 기록 실패: {e}")
+
+    def write_batch(self, rows):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO attachments (filename, size_text, window_title, first_seen, download_path) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+        self.written += len(rows)
+        self.batches += 1
+
+    def search(self, query, limit=200):
+        """파일명/창 제목 검색, 최근에 기록된 것부터 (filename, size_text, window_title, first_seen, download_path) 목록"""
+        terms = query.split()
+        if not terms:
+            return []
+        conn = self._connect()
+        columns = "a.filename, a.size_text, a.window_title, a.first_seen, a.download_path"
+        if self.fts and all(len(term) >= self.FTS_MIN_TERM for term in terms):
+            match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            sql = (f"SELECT {columns} FROM attachments_trgm f JOIN attachments a ON a.id = f.rowid "
+                   "WHERE attachments_trgm MATCH ? ORDER BY f.rowid DESC LIMIT ?")
+            return conn.execute(sql, (match, limit)).fetchall()
+        # FTS와 같은 범위(파일명, 창 제목)를 부분 문자열로 검색
+        where = " AND ".join("(a.filename LIKE ? ESCAPE '\\' OR a.window_title LIKE ? ESCAPE '\\')"
+                             for _ in terms)
+        params = []
+        for term in terms:
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            params += [pattern, pattern]
+        sql = f"SELECT {columns} FROM attachments a WHERE {where} ORDER BY a.id DESC LIMIT ?"
+        return conn.execute(sql, params + [limit]).fetchall()
+
+
+_attachment_history = None
+
+def get_attachment_history():
+    global _attachment_history
+    if _attachment_history is None:
+        _attachment_history = AttachmentHistory()
+        _attachment_history.start()
+    return _attachment_history
+
+class DuplicateFinder:
+    """다운로드 폴더의 내용 중복 파일 탐지 (백그라운드, 속도 제한)
+
+    크기가 같은 파일끼리만 앞부분(partial_size) 해시를 비교하고, 그것까지 같을 때만 전체 해시를 계산함
+    해시는 (이름, 크기, 수정 시각)과 함께 hashes.db에 저장되어 다시 계산하지 않음
+    읽기 속도는 max_rate(바이트/초)로 제한하고, 수정된 지 settle_delay초가 지나지 않은 파일은 나중에 다시 확인함
+    중복이 발견되면 add_listener로 등록한 콜백에 파일명 목록이 전달됨 (탐지 스레드에서 호출)
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS hashes (
+            name TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            partial TEXT,
+            full TEXT
+        );
+        CREATE INDEX IF NOT EXISTS hashes_size ON hashes (size);
+    """
+
+    def __init__(self, download_index, db_path=None, chunk_size=1 << 20, partial_size=64 * 1024,
+                 max_rate=16 * 1024 * 1024, settle_delay=5.0):
+        self.download_index = download_index
+        self.db_path = db_path or os.path.join(get_app_data_dir(), "hashes.db")
+        self.chunk_size = chunk_size
+        self.partial_size = partial_size
+        self.max_rate = max_rate
+        self.settle_delay = settle_delay
+        self.duplicates = {}
+        self.bytes_hashed = 0
+        self.full_hashes = 0
+        self._queue = queue.Queue()
+        self._rechecks = set()
+        self._listeners = []
+        self._conn = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.download_index.add_listener(self.enqueue)
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def enqueue(self, names):
+        for name in names:
+            self._queue.put(os.path.normcase(name))
+
+    def original_of(self, filename):
+        """filename이 중복이면 원본 파일명, 아니면 None"""
+        return self.duplicates.get(os.path.normcase(filename))
+
+    def _run(self):
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.executescript(self.SCHEMA)
+        self.enqueue(self.download_index.names())
+        while True:
+            name = self._queue.get()
+            try:
+                self.process(name)
+            except Exception as e:
+                print(f"중복 확인 실패 ({name}): {e}")
+
+    def _recheck(self, name):
+        self._rechecks.discard(name)
+        self._queue.put(name)
+
+    def _row(self, name):
+        return self._conn.execute(
+            "SELECT size, mtime, partial, full FROM hashes WHERE name = ?", (name,)).fetchone()
+
+    def process(self, name):
+        info = self.download_index.get(name)
+        conn = self._conn
+        if info is None:
+            with conn:
+                conn.execute("DELETE FROM hashes WHERE name = ?", (name,))
+            self._clear(name)
+            # 원본이 사라졌으면 그 중복들을 다시 확인
+            for member, original in list(self.duplicates.items()):
+                if original == name:
+                    self._clear(member)
+                    self._queue.put(member)
+            return
+        size, mtime = info
+        if size == 0:
+            return
+        if time.time() - mtime < self.settle_delay:
+            # 아직 기록 중일 수 있음: 받는 동안 알림이 계속 오므로 파일마다 다시 확인 예약은 하나만 둠
+            if name not in self._rechecks:
+                self._rechecks.add(name)
+                timer = threading.Timer(self.settle_delay, self._recheck, args=(name,))
+                timer.daemon = True
+                timer.start()
+            return
+
+        row = self._row(name)
+        if row is None or row[0] != size or row[1] != mtime:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO hashes (name, size, mtime) VALUES (?, ?, ?)",
+                             (name, size, mtime))
+
+        others = [r[0] for r in conn.execute(
+            "SELECT name FROM hashes WHERE size = ? AND name != ?", (size, name))]
+        path = os.path.join(self.download_index.path, name)
+        # 이미 하드 링크로 합쳐진 파일은 공간을 차지하지 않으므로 중복으로 보지 않음
+        others = [other for other in others
+                  if self.download_index.get(other) is not None and
+                  not self._same_file(path, os.path.join(self.download_index.path, other))]
+        if not others:
+            self._clear(name)
+            return
+
+        partial = self._hash(name, "partial")
+        matches = [other for other in others if self._hash(other, "partial") == partial]
+        if not matches:
+            self._clear(name)
+            return
+        full = self._hash(name, "full")
+        group = [other for other in matches if self._hash(other, "full") == full]
+        if not group:
+            self._clear(name)
+            return
+
+        # 가장 먼저 받은 파일을 원본으로 봄 (같으면 'file (1).hwp'보다 'file.hwp'처럼 짧은 이름)
+        members = sorted([name] + group, key=lambda n: (self.download_index.get(n)[1], len(n), n))
+        original = members[0]
+        changed = []
+        for member in members[1:]:
+            if self.duplicates.get(member) != original:
+                self.duplicates[member] = original
+                changed.append(member)
+        if changed:
+            log(f"중복 파일 {len(changed)}개 발견 (원본: {original})")
+            self._notify(changed)
+
+    def _clear(self, name):
+        if self.duplicates.pop(name, None) is not None:
+            self._notify([name])
+
+    @staticmethod
+    def _same_file(a, b):
+        try:
+            return os.path.samefile(a, b)
+        except OSError:
+            return False
+
+    def _hash(self, name, kind):
+        """저장된 해시를 쓰고, 없으면 계산해서 저장"""
+        row = self._row(name)
+        cached = row[2] if kind == "partial" else row[3]
+        if cached:
+            return cached
+        limit = self.partial_size if kind == "partial" else None
+        digest = self._hash_file(os.path.join(self.download_index.path, name), limit)
+        if kind == "partial" and row[0] <= self.partial_size:
+            # 작은 파일은 앞부분 해시가 곧 전체 해시
+            sql = "UPDATE hashes SET partial = ?, full = ? WHERE name = ?"
+            params = (digest, digest, name)
+        else:
+            sql = f"UPDATE hashes SET {kind} = ? WHERE name = ?"
+            params = (digest, name)
+        with self._conn:
+            self._conn.execute(sql, params)
+        return digest
+
+    def _hash_file(self, path, limit=None):
+        h = hashlib.sha256()
+        remaining = limit
+        with open(path, "rb") as f:
+            while remaining is None or remaining > 0:
+                size = self.chunk_size if remaining is None else min(self.chunk_size, remaining)
+                chunk = f.read(size)
+                if not chunk:
+                    break
+                h.update(chunk)
+                self.bytes_hashed += len(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+                # 감시 루프/디스크와 경쟁하지 않도록 읽기 속도 제한
+                time.sleep(len(chunk) / self.max_rate)
+        if limit is None:
+            self.full_hashes += 1
+        return h.hexdigest()
+
+    def _notify(self, names):
+        for callback in self._listeners:
+            try:
+                callback(names)
+            except Exception as e:
+                print(f"중복 알림 처리 오류: {e}")
+
+    def verified_original(self, filename):
+        """지우거나 링크하기 직전에 원본과 내용이 아직 같은지 바이트 단위로 다시 확인
+
+        해시한 뒤에 어느 한쪽이 다시 받아지거나 바뀌었을 수 있으므로 저장된 해시는 믿지 않음
+        다르면 중복 표시를 지우고 다시 확인하도록 넣은 뒤 None
+        """
+        original = self.original_of(filename)
+        if original is None:
+            return None
+        path = os.path.join(self.download_index.path, filename)
+        original_path = os.path.join(self.download_index.path, original)
+        if self._identical(path, original_path):
+            return original_path
+        log(f"중복 파일 내용이 달라져 정리하지 않음: {filename} / {original}")
+        self._clear(os.path.normcase(filename))
+        self.enqueue([filename, original])
+        return None
+
+    def _identical(self, a, b):
+        try:
+            if os.path.getsize(a) != os.path.getsize(b):
+                return False
+            with open(a, "rb") as fa, open(b, "rb") as fb:
+                while True:
+                    chunk = fa.read(self.chunk_size)
+                    if chunk != fb.read(self.chunk_size):
+                        return False
+                    if not chunk:
+                        return True
+        except OSError:
+            return False
+
+    def remove_duplicate(self, filename):
+        """중복 파일 삭제 (원본은 유지, 내용이 달라졌으면 지우지 않고 False)"""
+        if self.verified_original(filename) is None:
+            return False
+        os.remove(os.path.join(self.download_index.path, filename))
+        return True
+
+    def link_duplicate(self, filename):
+        """중복 파일을 원본에 대한 하드 링크로 바꿔 디스크 공간 회수 (내용이 달라졌으면 False)"""
+        original_path = self.verified_original(filename)
+        if original_path is None:
+            return False
+        path = os.path.join(self.download_index.path, filename)
+        tmp_path = path + ".link_tmp"
+        os.link(original_path, tmp_path)
+        os.replace(tmp_path, path)
+        return True
+
+
+_duplicate_finder = None
+
+def get_duplicate_finder():
+    global _duplicate_finder
+    with _singleton_lock:
+        if _duplicate_finder is None:
+            finder = DuplicateFinder(get_download_index())
+            finder.start()
+            _duplicate_finder = finder
+    return _duplicate_finder
+
+
+DOWNLOAD_ACTIVE = "active"
+DOWNLOAD_COMPLETE = "complete"
+DOWNLOAD_INCOMPLETE = "incomplete"
+
+DownloadProgress = namedtuple("DownloadProgress", ["state", "size", "expected", "rate"])
+
+
+def is_file_locked(path):
+    """다른 프로세스가 쓰기 공유 없이 열고 있어 쓰기 모드로 열 수 없으면 True (내용은 바꾸지 않음)"""
+    try:
+        with open(path, "r+b"):
+            return False
+    except OSError as e:
+        # ERROR_SHARING_VIOLATION(32)만 잠금으로 봄 (읽기 전용 파일 등 권한 문제는 아님)
+        return getattr(e, "winerror", None) == 32
+
+
+class DownloadCompletionTracker:
+    """다운로드 폴더 변경 알림으로 파일이 다 받아졌는지 판단
+
+    쿨메신저는 파일을 받는 동안에도 최종 파일명으로 쓰므로 '파일이 있음'만으로는 완료가 아님
+    인덱스 알림이 올 때마다 (시각, 크기)를 기록해 전송 속도를 구하고,
+    크기가 레이블 크기와 맞으면 settle초, 그 밖에는 stable초 동안 더 바뀌지 않을 때 완료로 봄
+    오차 범위 안이라도 레이블 크기에 못 미치면, 쿨메신저가 아직 파일을 쓰기로 열고 있는 동안(is_locked)은 받는 중으로 봄
+    레이블 크기(반올림 오차 제외)에 못 미친 채 stall초 넘게 멈춘 파일만 불완전(DOWNLOAD_INCOMPLETE)으로 봄
+    레이블보다 큰 파일은 표시 크기가 부정확한 것일 수 있으므로 멈추면 완료로 봄
+    완료/불완전으로 바뀐 파일명 목록은 add_listener로 등록한 콜백에 전달됨 (인덱스/타이머 스레드에서 호출)
+    """
+
+    def __init__(self, download_index, settle=1.0, stable=3.0, stall=10.0, clock=time.monotonic,
+                 is_locked=None):
+        self.download_index = download_index
+        self.settle = settle
+        self.stable = stable
+        self.stall = stall
+        self.clock = clock
+        self.is_locked = is_locked or is_file_locked
+        self._labels = {}
+        self._samples = {}
+        self._reported = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._timer = None
+        download_index.add_listener(self._on_changed)
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def expect(self, labels):
+        """메시지 창에서 읽은 첨부파일 레이블 등록 (레이블 크기와 비교해 완료 판단)"""
+        with self._lock:
+            for label in labels:
+                if label is not None:
+                    self._labels[os.path.normcase(label.filename)] = label
+
+    def _on_changed(self, names):
+        now = self.clock()
+        with self._lock:
+            for name in names:
+                key = os.path.normcase(name)
+                info = self.download_index.get(name)
+                if info is None:
+                    self._samples.pop(key, None)
+                    self._reported.pop(key, None)
+                    continue
+                size = info[0]
+                sample = self._samples.get(key)
+                if sample is None:
+                    rate = 0.0
+                else:
+                    last_time, last_size, rate = sample
+                    elapsed = now - last_time
+                    if elapsed > 0 and size >= last_size:
+                        # 알림 간격이 들쭉날쭉하므로 지수 이동 평균으로 완만하게
+                        current = (size - last_size) / elapsed
+                        rate = current if rate == 0.0 else rate * 0.7 + current * 0.3
+                self._samples[key] = (now, size, rate)
+                self._reported.pop(key, None)
+        self._schedule(self.settle)
+
+    def progress(self, filename, now=None):
+        """DownloadProgress, 폴더에 없으면 None
+
+        받는 중인 모습을 본 적 없고 레이블도 없는 파일(프로그램 시작 전에 받은 파일 등)은 완료로 봄
+        """
+        info = self.download_index.get(filename)
+        if info is None:
+            return None
+        now = self.clock() if now is None else now
+        key = os.path.normcase(filename)
+        size = info[0]
+        with self._lock:
+            label = self._labels.get(key)
+            sample = self._samples.get(key)
+        expected = label.expected_bytes if label else None
+        short = (label is not None and size < label.expected_bytes - label.tolerance
+                 and not label.matches(size))
+        # 오차 범위 안이지만 레이블 크기보다 작음: 마지막 몇 퍼센트를 받는 중일 수 있으므로 파일이 닫혔는지 확인
+        writing = (not short and label is not None and size < label.expected_bytes and
+                   self.is_locked(os.path.join(self.download_index.path, filename)))
+        if sample is None:
+            state = DOWNLOAD_INCOMPLETE if short else DOWNLOAD_ACTIVE if writing else DOWNLOAD_COMPLETE
+            return DownloadProgress(state, size, expected, 0.0)
+        last_time, _, rate = sample
+        idle = now - last_time
+        if short:
+            state = DOWNLOAD_INCOMPLETE if idle >= self.stall else DOWNLOAD_ACTIVE
+        elif writing:
+            state = DOWNLOAD_ACTIVE
+        elif label is not None and label.matches(size):
+            state = DOWNLOAD_COMPLETE if idle >= self.settle else DOWNLOAD_ACTIVE
+        else:
+            state = DOWNLOAD_COMPLETE if idle >= self.stable else DOWNLOAD_ACTIVE
+        return DownloadProgress(state, size, expected, rate if state == DOWNLOAD_ACTIVE else 0.0)
+
+    def is_complete(self, filename):
+        progress = self.progress(filename)
+        return progress is not None and progress.state == DOWNLOAD_COMPLETE
+
+    def _schedule(self, delay):
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(delay, self._check)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _check(self):
+        """알림이 멈춘 뒤 상태가 바뀐 파일을 알림 (받는 중인 파일이 남아 있으면 다시 예약)"""
+        with self._lock:
+            self._timer = None
+            keys = list(self._samples)
+        now = self.clock()
+        changed = []
+        pending = []
+        for key in keys:
+            progress = self.progress(key, now)
+            if progress is None:
+                continue
+            if progress.state == DOWNLOAD_ACTIVE:
+                pending.append(key)
+                continue
+            with self._lock:
+                if self._reported.get(key) == progress.state:
+                    continue
+                self._reported[key] = progress.state
+            changed.append(key)
+        if changed:
+            for callback in self._listeners:
+                try:
+                    callback(changed)
+                except Exception as e:
+                    print(f"다운로드 완료 알림 처리 오류: {e}")
+        if pending:
+            self._schedule(min(self.settle, self.stable, self.stall))
+
+
+_completion_tracker = None
+
+def get_completion_tracker():
+    global _completion_tracker
+    with _singleton_lock:
+        if _completion_tracker is None:
+            _completion_tracker = DownloadCompletionTracker(get_download_index())
+    return _completion_tracker
 
 def load_default_icons():
     file_types = {
@@ -84,95 +840,1626 @@ def load_default_icons():
     }
     return file_types
 
-def get_file_icon(filename):
-    if filename in icon_cache:
-        return icon_cache[filename]
-    
-    file_types = load_default_icons()
-    mimetype, _ = mimetypes.guess_type(filename)
-    
-    if not mimetype:
-        icon = file_types['unknown']
-    elif mimetype.startswith('image/'):
-        icon = file_types['image']
-    elif mimetype.startswith('audio/'):
-        icon = file_types['audio']
-    elif mimetype.startswith('video/'):
-        icon = file_types['video']
-    elif mimetype.startswith('text/'):
-        icon = file_types['text']
-    elif mimetype == 'application/pdf':
-        icon = file_types['pdf']
-    elif mimetype in ['application/zip', 'application/x-rar-compressed']:
-        icon = file_types['archive']
-    elif mimetype.startswith('application/'):
-        icon = file_types['application']
-    else:
-        icon = file_types['unknown']
-    
-    icon_cache[filename] = icon
-    return icon
+def get_file_icon(filename):
+    if filename in icon_cache:
+        return icon_cache[filename]
+    
+    import mimetypes
+
+    file_types = load_default_icons()
+    mimetype, _ = mimetypes.guess_type(filename)
+    
+    if not mimetype:
+        icon = file_types['unknown']
+    elif mimetype.startswith('image/'):
+        icon = file_types['image']
+    elif mimetype.startswith('audio/'):
+        icon = file_types['audio']
+    elif mimetype.startswith('video/'):
+        icon = file_types['video']
+    elif mimetype.startswith('text/'):
+        icon = file_types['text']
+    elif mimetype == 'application/pdf':
+        icon = file_types['pdf']
+    elif mimetype in ['application/zip', 'application/x-rar-compressed']:
+        icon = file_types['archive']
+    elif mimetype.startswith('application/'):
+        icon = file_types['application']
+    else:
+        icon = file_types['unknown']
+    
+    icon_cache[filename] = icon
+    return icon
+
+_LABEL_SIZE_RE = re.compile(r"\((\d+(?:\.(\d+))?)\s?([KMG]B)\)", re.IGNORECASE)
+_LABEL_SUFFIXES = ("B)", "b)")
+_UNIT_BYTES = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+# 반올림 오차 상한 (크기 대비): '(1 GB)'처럼 자릿수가 적은 레이블이 ±512 MB까지 맞다고 보지 않도록
+LABEL_TOLERANCE_RATIO = 0.05
+_parsed_labels = {}
+
+
+class AttachmentLabel(namedtuple("AttachmentLabel", ["filename", "size", "unit", "expected_bytes", "tolerance"])):
+    """첨부파일 레이블 해석 결과, 예: '보고서.hwp (12.3 MB)'
+
+    expected_bytes는 1024 단위로 환산한 크기, tolerance는 표시 자릿수 반올림 오차(바이트)
+    tolerance는 크기의 LABEL_TOLERANCE_RATIO배(최소 1 KB)를 넘지 않음
+    """
+
+    __slots__ = ()
+
+    def matches(self, actual_bytes):
+        """실제 파일 크기가 레이블 크기와 맞는지 (1000 단위로 표시하는 경우도 허용)"""
+        if abs(actual_bytes - self.expected_bytes) <= self.tolerance:
+            return True
+        scale = (1000 / 1024) ** ("KMG".index(self.unit[0]) + 1)
+        return abs(actual_bytes - self.expected_bytes * scale) <= self.tolerance * scale
+
+
+def parse_attachment_label(text):
+    """'파일명 (숫자 KB|MB|GB)' 형식이면 AttachmentLabel, 아니면 None
+
+    컨트롤 대부분은 끝이 'B)'가 아니므로 정규식 전에 endswith로 먼저 거름
+    같은 레이블은 스캔마다 다시 나오므로 해석 결과를 텍스트별로 기억해둠
+    """
+    if not text.endswith(_LABEL_SUFFIXES):
+        return None
+    label = _parsed_labels.get(text)
+    if label is not None:
+        return label
+    start = text.rfind("(")
+    match = _LABEL_SIZE_RE.fullmatch(text, start) if start >= 0 else None
+    if match is None:
+        return None
+    number, fraction, unit = match.groups()
+    unit = unit.upper()
+    unit_bytes = _UNIT_BYTES[unit]
+    size = float(number)
+    tolerance = unit_bytes // (2 * 10 ** len(fraction)) if fraction else unit_bytes // 2
+    tolerance = min(tolerance, max(int(size * unit_bytes * LABEL_TOLERANCE_RATIO), 1024))
+    label = AttachmentLabel(text[:start].strip(), size, unit, int(size * unit_bytes), tolerance)
+    if len(_parsed_labels) >= 4096:
+        _parsed_labels.clear()
+    _parsed_labels[text] = label
+    return label
+
+
+def extract_filename(text):
+    label = parse_attachment_label(text.strip())
+    if label:
+        return label.filename
+    return text.strip()
+
+def extract_size_text(text):
+    """첨부파일 레이블의 크기 부분, 예: '(12.3 MB)'"""
+    text = text.strip()
+    label = parse_attachment_label(text)
+    return text[text.rfind("("):] if label else ""
+
+
+def build_label_corpus(count=10000, candidate_ratio=0.1):
+    """레이블 해석 벤치마크용 컨트롤 텍스트 (실제 메시지 창 형태의 레이블 + 합성 레이블 + 일반 컨트롤)"""
+    real = [
+        "2024학년도 1학기 시간표.hwp (45.5 KB)",
+        "가정통신문(3월).pdf (1.2 MB)",
+        "수업자료 모음.zip (120 MB)",
+        "사진 (1).jpg (3.4 MB)",
+        "report_final(수정).docx (88 KB)",
+        "영상.mp4 (1.05 GB)",
+    ]
+    others = [
+        SAVE_BUTTON_TEXT, "", "확인", "받은 메시지", "보낸 사람: 홍길동 (교무부)", "2024-03-02 (토) 09:30",
+        "첨부파일 (3)", "메시지 관리함 - 1개의 안읽은 메시지", "label 0-1", "(주)지란지교 (B)",
+    ]
+    corpus = []
+    for i in range(count):
+        if i % int(1 / candidate_ratio) == 0:
+            if i % 3 == 0:
+                corpus.append(real[i % len(real)])
+            else:
+                corpus.append(f"첨부파일_{i:05d}.hwp ({(i % 900) + 1}.{i % 10} {('KB', 'MB', 'GB')[i % 3]})")
+        else:
+            corpus.append(others[i % len(others)])
+    return corpus
+
+
+def benchmark_label_parser(corpus=None, repeat=5):
+    """--label-benchmark: 스캔 한 번에 해당하는 처리의 컨트롤당 시간(ns) 비교
+
+    regex: 예전 방식 (모든 컨트롤에 SIZE_PATTERN.search, 레이블이면 파일명 추출을 위해 한 번 더)
+    parser_first: 처음 보는 레이블 (해석 결과 캐시 비움), parser_repeat: 같은 창을 다시 스캔
+    """
+    corpus = corpus or build_label_corpus()
+
+    def regex_pass():
+        for text in corpus:
+            if SIZE_PATTERN.search(text):
+                match = SIZE_PATTERN.search(text)
+                text[:match.start()].strip()
+
+    def parser_pass():
+        for text in corpus:
+            if text.endswith(_LABEL_SUFFIXES):
+                parse_attachment_label(text)
+
+    def parser_first_pass():
+        _parsed_labels.clear()
+        parser_pass()
+
+    results = {}
+    for name, func in (("regex", regex_pass), ("parser_first", parser_first_pass), ("parser_repeat", parser_pass)):
+        best = min(_timed(func) for _ in range(repeat))
+        results[name] = round(best / len(corpus) * 1e9, 1)
+    results["labels"] = sum(1 for text in corpus if parse_attachment_label(text))
+    results["controls"] = len(corpus)
+    return results
+
+
+def _timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+def diff_attachments(old, new):
+    """이전/현재 첨부파일 목록 비교
+
+    반환값: (추가된 항목 목록, 사라진 항목 목록) - 각 목록은 입력 순서를 유지하고 중복 없음
+    """
+    old_keys = dict.fromkeys(old)
+    new_keys = dict.fromkeys(new)
+    added = [key for key in new_keys if key not in old_keys]
+    removed = [key for key in old_keys if key not in new_keys]
+    return added, removed
+
+def log(msg):
+    timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S.%f]")[:-3]
+    print(f"{timestamp} {msg}")
+    get_metrics().note(f"{timestamp} {msg}")
+
+
+class Histogram:
+    """소요 시간 히스토그램 (ms 단위 고정 구간, 분위수는 해당 구간의 상한으로 근사)"""
+
+    BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect.bisect_left(self.BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        rank = p * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return self.BOUNDS[index] if index < len(self.BOUNDS) else self.max
+        return 0.0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": round(self.max, 3),
+        }
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """핫 패스 계측 (소요 시간 히스토그램 + 카운터)
+
+    꺼져 있으면 enabled 확인만 하고 바로 돌아가므로 감시 루프에 부담이 거의 없음
+    COOLMSG_METRICS=1 환경 변수로 켜거나, 패널 제목을 더블클릭해 통계 창을 열면 켜짐
+    dump()는 스냅샷을 JSON 한 줄로 metrics.log에 추가하고 max_bytes를 넘으면 metrics.log.1.. 로 돌려씀
+    add_source(name, func)로 등록한 구성 요소의 stats()도 스냅샷의 stats 항목에 함께 담김
+    """
+
+    def __init__(self, enabled=False, dump_path=None, max_bytes=256 * 1024, backups=3):
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.histograms = {}
+        self.counters = {}
+        self.recent_logs = deque(maxlen=200)
+        self.started_at = time.time()
+        self.sources = {}
+        self._lock = threading.Lock()
+
+    def add_source(self, name, func):
+        """통계 창/덤프에 함께 보여줄 구성 요소 상태 (func는 dict를 반환)"""
+        self.sources[name] = func
+
+    def source_stats(self):
+        stats = {}
+        for name, func in list(self.sources.items()):
+            try:
+                stats[name] = func()
+            except Exception as e:
+                stats[name] = {"error": str(e)}
+        return stats
+
+    def time(self, name):
+        """with metrics.time("tree_scan"): ... 형태로 구간 시간 기록"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds * 1000)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def note(self, line):
+        """최근 로그 보관 (패키징된 exe에는 콘솔이 없으므로 덤프에 함께 남김)"""
+        if self.enabled:
+            self.recent_logs.append(line)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.started_at = time.time()
+
+    def snapshot(self):
+        stats = self.source_stats()
+        with self._lock:
+            return {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "uptime": round(time.time() - self.started_at, 1),
+                "timings_ms": {name: h.summary() for name, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "stats": stats,
+            }
+
+    def format(self):
+        """통계 창에 표시할 텍스트"""
+        snap = self.snapshot()
+        lines = [f"{'구간':<16}{'횟수':>7}{'평균':>9}{'p50':>8}{'p95':>8}{'최대':>9}  (ms)"]
+        for name, h in snap["timings_ms"].items():
+            lines.append(f"{name:<16}{h['count']:>7}{h['avg']:>9.2f}{h['p50']:>8g}{h['p95']:>8g}{h['max']:>9.2f}")
+        lines.append("")
+        for name, value in snap["counters"].items():
+            lines.append(f"{name:<24}{value:>8}")
+        for source, values in snap["stats"].items():
+            lines.append(f"\n[{source}]")
+            for name, value in values.items():
+                value = f"{value:.2f}" if isinstance(value, float) else value
+                lines.append(f"  {name:<22}{value:>10}")
+        lines.append(f"\n측정 시간: {snap['uptime']:.0f}초")
+        return "\n".join(lines)
+
+    def dump(self):
+        """스냅샷과 최근 로그를 회전 로그 파일에 추가하고 파일 경로 반환"""
+        path = self.dump_path or os.path.join(get_app_data_dir(), "metrics.log")
+        record = self.snapshot()
+        record["logs"] = list(self.recent_logs)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        if os.path.exists(path) and os.path.getsize(path) + len(line) > self.max_bytes:
+            for index in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{path}.{index}"):
+                    os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+            os.replace(path, f"{path}.1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+        return path
+
+
+_metrics = None
+
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics(enabled=os.environ.get("COOLMSG_METRICS") == "1")
+    return _metrics
+
+class WindowBackend:
+    """창 조회/조작 인터페이스 (감시 로직은 이 인터페이스만 사용)"""
+
+    def enum_windows(self):
+        """최상위 창 핸들 목록"""
+        raise NotImplementedError
+
+    def enum_child_windows(self, hwnd):
+        """모든 하위 컨트롤 핸들 목록 (EnumChildWindows와 같이 자손 전체)"""
+        raise NotImplementedError
+
+    def get_window_text(self, hwnd):
+        """최상위 창 제목"""
+        raise NotImplementedError
+
+    def get_text(self, hwnd):
+        """컨트롤 텍스트 (WM_GETTEXT)"""
+        raise NotImplementedError
+
+    def click(self, hwnd):
+        """버튼 클릭 (BM_CLICK)"""
+        raise NotImplementedError
+
+    def is_child(self, parent, hwnd):
+        """hwnd가 parent의 자손인지 여부"""
+        raise NotImplementedError
+
+    def is_window(self, hwnd):
+        """창이 아직 살아있는지 여부"""
+        raise NotImplementedError
+
+    def get_class_name(self, hwnd):
+        """창 클래스 이름"""
+        raise NotImplementedError
+
+    def get_parent(self, hwnd):
+        """부모 창 핸들 (없으면 0)"""
+        raise NotImplementedError
+
+    def get_foreground_window(self):
+        """현재 전경 창 핸들"""
+        raise NotImplementedError
+
+    def get_window_process_id(self, hwnd):
+        """창을 만든 프로세스 ID (창이 없으면 0)"""
+        raise NotImplementedError
+
+    def get_window_rect(self, hwnd):
+        """화면 좌표의 창 영역 (left, top, right, bottom), 창이 없으면 OSError"""
+        raise NotImplementedError
+
+
+class Win32WindowBackend(WindowBackend):
+    """pywin32 기반 실제 백엔드
+
+    get_text는 스레드별로 재사용하는 ctypes 버퍼에 WM_GETTEXT로 받아오고 (필요할 때만 두 배로 늘림)
+    다른 프로세스로 보내는 메시지는 모두 SendMessageTimeout(SMTO_ABORTIFHUNG)을 써서
+    응답 없는 창은 send_timeout_ms(클릭은 click_timeout_ms) 뒤 TimeoutError로 넘김
+    SMTO_ABORTIFHUNG로 멈춘 창을 건너뛸 때는 마지막 오류가 0으로 남는 경우가 있어 이것도 응답 없음으로 봄
+    그 사이 사라진 컨트롤(ERROR_INVALID_WINDOW_HANDLE) 등 다른 실패는 OSError로 넘김 (창 전체를 응답 없음으로 보지 않도록)
+    """
+
+    SMTO_ABORTIFHUNG = 0x0002
+    ERROR_TIMEOUT = 1460
+
+    def __init__(self, send_timeout_ms=200, click_timeout_ms=2000):
+        self.send_timeout_ms = send_timeout_ms
+        self.click_timeout_ms = click_timeout_ms
+        self.timeouts = 0
+        self._local = threading.local()
+        self._send_message_timeout = None
+
+    def _send(self, hwnd, msg, wparam, lparam, timeout_ms=None):
+        import ctypes
+
+        timeout_ms = timeout_ms or self.send_timeout_ms
+        if self._send_message_timeout is None:
+            from ctypes import wintypes
+
+            func = ctypes.WinDLL("user32", use_last_error=True).SendMessageTimeoutW
+            func.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM,
+                             wintypes.UINT, wintypes.UINT, ctypes.POINTER(ctypes.c_size_t)]
+            func.restype = wintypes.LPARAM
+            self._send_message_timeout = func
+        result = getattr(self._local, "result", None)
+        if result is None:
+            result = self._local.result = ctypes.c_size_t()
+        if not self._send_message_timeout(hwnd, msg, wparam, lparam, self.SMTO_ABORTIFHUNG,
+                                          timeout_ms, result):
+            error = ctypes.get_last_error()
+            if error not in (0, self.ERROR_TIMEOUT):
+                raise ctypes.WinError(error)
+            self.timeouts += 1
+            raise TimeoutError(f"no response from {hex(hwnd)} in {timeout_ms}ms")
+        return result.value
+
+    def _text_buffer(self, chars):
+        """chars 글자 이상 담을 수 있는 이 스레드의 재사용 버퍼"""
+        import ctypes
+
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or len(buffer) < chars:
+            size = max(chars, 2 * len(buffer) if buffer is not None else 256)
+            buffer = self._local.buffer = ctypes.create_unicode_buffer(size)
+        return buffer
+
+    def enum_windows(self):
+        result = []
+        win32gui.EnumWindows(lambda h, param: param.append(h), result)
+        return result
+
+    def enum_child_windows(self, hwnd):
+        children = []
+        try:
+            win32gui.EnumChildWindows(hwnd, lambda ch, param: param.append(ch), children)
+        except win32gui.error:
+            # 자식이 없거나 창이 사라진 경우
+            pass
+        return children
+
+    def get_window_text(self, hwnd):
+        return win32gui.GetWindowText(hwnd)
+
+    def get_text(self, hwnd):
+        import ctypes
+
+        length = self._send(hwnd, win32con.WM_GETTEXTLENGTH, 0, 0)
+        if length == 0:
+            return ""
+        buffer = self._text_buffer(length + 1)
+        copied = self._send(hwnd, win32con.WM_GETTEXT, len(buffer), ctypes.addressof(buffer))
+        return ctypes.wstring_at(buffer, min(copied, len(buffer) - 1))
+
+    def click(self, hwnd):
+        self._send(hwnd, win32con.BM_CLICK, 0, 0, self.click_timeout_ms)
+
+    def is_child(self, parent, hwnd):
+        return bool(win32gui.IsChild(parent, hwnd))
+
+    def is_window(self, hwnd):
+        return bool(win32gui.IsWindow(hwnd))
+
+    def get_class_name(self, hwnd):
+        return win32gui.GetClassName(hwnd)
+
+    def get_parent(self, hwnd):
+        return win32gui.GetParent(hwnd)
+
+    def get_foreground_window(self):
+        return win32gui.GetForegroundWindow()
+
+    def get_window_process_id(self, hwnd):
+        import ctypes
+        from ctypes import wintypes
+
+        pid = wintypes.DWORD()
+        ctypes.windll.user32.GetWindowThreadProcessId(wintypes.HWND(hwnd), ctypes.byref(pid))
+        return pid.value
+
+    def get_window_rect(self, hwnd):
+        try:
+            return win32gui.GetWindowRect(hwnd)
+        except win32gui.error as e:
+            raise OSError(f"GetWindowRect failed for {hex(hwnd)}: {e}") from e
+
+
+class FakeWindow:
+    """FakeWindowBackend에서 사용하는 가상 창/컨트롤"""
+
+    def __init__(self, hwnd, text="", parent=None, class_name="Static", pid=0):
+        self.hwnd = hwnd
+        self.text = text
+        self.parent = parent
+        self.class_name = class_name
+        self.pid = pid
+        self.rect = (0, 0, 0, 0)
+        self.children = []
+        self.clicks = 0
+
+
+class FakeWindowBackend(WindowBackend):
+    """메모리 상의 가상 컨트롤 트리 (벤치마크/테스트용)
+
+    latency: 호출 1회당 지연(초). 실제 SendMessage 왕복 비용을 흉내냄
+    stall(): 최상위 창의 UI 스레드가 멈춘 것처럼 만들어, 그 창의 컨트롤에 보내는 get_text/click이
+    send_timeout초 기다린 뒤 TimeoutError를 내게 함 (Win32WindowBackend의 SendMessageTimeout과 같은 동작)
+    remove_after_enum(): 다음 enum_child_windows 직후 컨트롤을 없애, 스캔 도중 첨부파일 목록이
+    다시 만들어지는 경우처럼 이미 받은 HWND가 사라지게 함 (사라진 HWND 조회는 OSError)
+    """
+
+    def __init__(self, latency=0.0, send_timeout=0.2):
+        self.latency = latency
+        self.send_timeout = send_timeout
+        self.stalls = {}
+        self.timeouts = 0
+        self.pending_removals = []
+        self.windows = {}
+        self.top_level = []
+        self.call_counts = {}
+        self.foreground = 0
+        self.default_pid = 4242
+        self._next_hwnd = 0x1000
+
+    def add_window(self, text="", parent=None, class_name="Static", pid=None):
+        """창/컨트롤을 추가하고 핸들을 반환 (pid를 주지 않으면 부모 창의 프로세스, 최상위 창은 default_pid)"""
+        hwnd = self._next_hwnd
+        self._next_hwnd += 1
+        if pid is None:
+            pid = self.windows[parent].pid if parent is not None else self.default_pid
+        window = FakeWindow(hwnd, text, parent, class_name, pid)
+        self.windows[hwnd] = window
+        if parent is None:
+            self.top_level.append(hwnd)
+        else:
+            self.windows[parent].children.append(hwnd)
+        return hwnd
+
+    def remove_window(self, hwnd):
+        window = self.windows.pop(hwnd, None)
+        if window is None:
+            return
+        for child in list(window.children):
+            self.remove_window(child)
+        if window.parent is None:
+            self.top_level.remove(hwnd)
+        elif window.parent in self.windows:
+            self.windows[window.parent].children.remove(hwnd)
+
+    def set_text(self, hwnd, text):
+        self.windows[hwnd].text = text
+
+    def stall(self, hwnd, seconds=None):
+        """최상위 창 hwnd를 seconds초 동안 응답 없게 만듦 (None이면 unstall 할 때까지)"""
+        self.stalls[hwnd] = seconds
+
+    def unstall(self, hwnd):
+        self.stalls.pop(hwnd, None)
+
+    def remove_after_enum(self, hwnd):
+        """다음 enum_child_windows 호출이 끝난 직후 hwnd를 제거"""
+        self.pending_removals.append(hwnd)
+
+    def _send(self, hwnd):
+        """다른 프로세스로 보내는 메시지 흉내 (멈춘 창이면 지연 또는 TimeoutError)"""
+        if not self.stalls:
+            return
+        top = hwnd
+        while top in self.windows and self.windows[top].parent is not None:
+            top = self.windows[top].parent
+        if top not in self.stalls:
+            return
+        stall = self.stalls[top]
+        if stall is None or stall > self.send_timeout:
+            time.sleep(self.send_timeout)
+            self.timeouts += 1
+            raise TimeoutError(f"no response from {hex(hwnd)} in {int(self.send_timeout * 1000)}ms")
+        time.sleep(stall)
+
+    def reset_counts(self):
+        self.call_counts = {}
+
+    def _call(self, name):
+        self.call_counts[name] = self.call_counts.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def enum_windows(self):
+        self._call("enum_windows")
+        return list(self.top_level)
+
+    def enum_child_windows(self, hwnd):
+        self._call("enum_child_windows")
+        result = []
+        stack = list(reversed(self.windows[hwnd].children)) if hwnd in self.windows else []
+        while stack:
+            h = stack.pop()
+            result.append(h)
+            stack.extend(reversed(self.windows[h].children))
+        while self.pending_removals:
+            self.remove_window(self.pending_removals.pop())
+        return result
+
+    def get_window_text(self, hwnd):
+        self._call("get_window_text")
+        window = self.windows.get(hwnd)
+        return window.text if window else ""
+
+    def get_text(self, hwnd):
+        self._call("get_text")
+        window = self.windows.get(hwnd)
+        if window is None:
+            raise OSError(f"invalid window handle {hex(hwnd)}")
+        self._send(hwnd)
+        return window.text
+
+    def click(self, hwnd):
+        self._call("click")
+        window = self.windows.get(hwnd)
+        if window is None:
+            raise OSError(f"invalid window handle {hex(hwnd)}")
+        self._send(hwnd)
+        window.clicks += 1
+
+    def is_child(self, parent, hwnd):
+        self._call("is_child")
+        window = self.windows.get(hwnd)
+        while window is not None and window.parent is not None:
+            if window.parent == parent:
+                return True
+            window = self.windows.get(window.parent)
+        return False
+
+    def is_window(self, hwnd):
+        self._call("is_window")
+        return hwnd in self.windows
+
+    def get_class_name(self, hwnd):
+        self._call("get_class_name")
+        window = self.windows.get(hwnd)
+        return window.class_name if window else ""
+
+    def get_parent(self, hwnd):
+        self._call("get_parent")
+        window = self.windows.get(hwnd)
+        return window.parent or 0 if window else 0
+
+    def get_foreground_window(self):
+        self._call("get_foreground_window")
+        return self.foreground
+
+    def get_window_process_id(self, hwnd):
+        self._call("get_window_process_id")
+        window = self.windows.get(hwnd)
+        return window.pid if window else 0
+
+    def move_window(self, hwnd, rect):
+        self.windows[hwnd].rect = tuple(rect)
+
+    def get_window_rect(self, hwnd):
+        self._call("get_window_rect")
+        window = self.windows.get(hwnd)
+        if window is None:
+            raise OSError(f"invalid window handle {hex(hwnd)}")
+        return window.rect
+
+
+def build_fake_message_window(backend, attachment_count=50, depth=3, filler_count=20,
+                              title="메시지 관리함"):
+    """쿨메신저 메시지 창과 비슷한 가상 컨트롤 트리 생성
+
+    depth 단계로 중첩된 패널 안에 첨부파일 레이블과 '모든파일 저장' 버튼을 배치함
+    """
+    top = backend.add_window(title, class_name="#32770")
+    parent = top
+    for level in range(depth):
+        for i in range(filler_count):
+            backend.add_window(f"label {level}-{i}", parent)
+        parent = backend.add_window("", parent, class_name="#32770")
+    for i in range(attachment_count):
+        backend.add_window(f"첨부파일_{i:04d}.hwp ({(i % 900) + 1}.{i % 10} KB)", parent)
+    backend.add_window(SAVE_BUTTON_TEXT, parent, class_name="Button")
+    return top
+
+
+_window_backend = None
+
+def get_window_backend():
+    global _window_backend
+    if _window_backend is None:
+        _window_backend = Win32WindowBackend()
+    return _window_backend
+
+def set_window_backend(backend):
+    """감시 로직이 사용할 백엔드 교체 (FakeWindowBackend 등)"""
+    global _window_backend
+    _window_backend = backend
+
+class WindowTitleMatcher:
+    """여러 제목 키워드를 하나의 정규식으로 묶어 최상위 창을 한 번만 훑는 검색기
+
+    keywords의 각 항목은 부분 문자열(str) 또는 컴파일된 정규식(re.Pattern)
+    앞쪽 키워드일수록 우선순위가 높음 (정규식 플래그는 인라인 플래그로 지정해야 함)
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        parts = []
+        for i, keyword in enumerate(self.keywords):
+            pattern = keyword.pattern if isinstance(keyword, re.Pattern) else re.escape(keyword)
+            parts.append(f"(?P<k{i}>{pattern})")
+        pattern = "|".join(parts)
+        if parts and all(isinstance(k, str) and k for k in self.keywords):
+            # 모두 부분 문자열이면 첫 글자 집합 전방탐색을 붙여 정규식 엔진이 후보 위치만 시도하도록 함
+            first_chars = "".join(sorted(set(re.escape(k[0]) for k in self.keywords)))
+            pattern = f"(?=[{first_chars}])(?:{pattern})"
+        self.regex = re.compile(pattern) if parts else None
+
+    def rank(self, title):
+        """제목과 일치하는 가장 우선순위 높은 키워드 번호, 없으면 None
+
+        합친 정규식은 일치 여부만 판단함 (finditer는 겹치지 않는 일치만 돌려주므로 앞에서 시작하는
+        낮은 순위 키워드가 높은 순위 키워드를 가릴 수 있음). 일치하는 드문 제목만 키워드별로 다시 확인
+        """
+        if self.regex is None or self.regex.search(title) is None:
+            return None
+        for index, keyword in enumerate(self.keywords):
+            if keyword.search(title) if isinstance(keyword, re.Pattern) else keyword in title:
+                return index
+        return None
+
+    def find(self, backend=None):
+        """일치하는 최상위 창 핸들 목록 (중복 없음, 키워드 우선순위 -> 열거 순서)"""
+        backend = backend or get_window_backend()
+        ranked = []
+        with get_metrics().time("enum_windows"):
+            for order, hwnd in enumerate(backend.enum_windows()):
+                rank = self.rank(backend.get_window_text(hwnd))
+                if rank is not None:
+                    ranked.append((rank, order, hwnd))
+        ranked.sort()
+        return [hwnd for _, _, hwnd in ranked]
+
+
+_title_matchers = {}
+
+def get_title_matcher(keywords):
+    key = tuple(keywords)
+    matcher = _title_matchers.get(key)
+    if matcher is None:
+        matcher = _title_matchers[key] = WindowTitleMatcher(key)
+    return matcher
+
+def find_window_by_title_keyword(keywords, backend=None):
+    return get_title_matcher(keywords).find(backend)
+
+
+def _find_window_by_title_keyword_loop(keywords, backend):
+    """예전 구현 (벤치마크 비교용): 키워드마다 최상위 창을 모두 다시 열거하고 제목을 다시 읽음"""
+    result = []
+    for keyword in keywords:
+        for hwnd in backend.enum_windows():
+            if keyword in backend.get_window_text(hwnd):
+                result.append(hwnd)
+    return result
+
+
+def benchmark_title_matcher(counts=(500, 5000), keywords=TARGET_WINDOW_TITLE, latency=0.0, repeat=5):
+    """--title-benchmark: 최상위 창 검색 한 번의 시간(ms)과 백엔드 호출 수를 예전 반복문과 비교
+
+    창 제목은 실제 데스크톱 형태의 합성 제목이며 약 1%가 대상 창
+    latency를 주면 호출 1회당 지연을 넣어 실제 창 목록 조회 비용을 흉내냄
+    """
+    titles = ["제목 없음 - 메모장", "Chrome - 새 탭", "받은 편지함 - Outlook", "탐색기", "",
+              "카카오톡", "한글 - 가정통신문.hwp", "Program Manager", "작업 표시줄"]
+    results = []
+    for count in counts:
+        backend = FakeWindowBackend(latency=latency)
+        for i in range(count):
+            if i % 100 == 50:
+                backend.add_window(f"{i % 7}개의 안읽은 메시지" if i % 200 == 50 else "메시지 관리함")
+            else:
+                backend.add_window(f"{titles[i % len(titles)]} ({i})")
+        matcher = WindowTitleMatcher(keywords)
+        row = {"windows": count, "matches": len(matcher.find(backend))}
+        for name, func in (("loop", lambda: _find_window_by_title_keyword_loop(keywords, backend)),
+                           ("matcher", lambda: matcher.find(backend))):
+            backend.reset_counts()
+            func()
+            row[f"{name}_calls"] = sum(backend.call_counts.values())
+            row[f"{name}_ms"] = round(min(_timed(func) for _ in range(repeat)) * 1000, 3)
+        results.append(row)
+    return results
+
+def scan_message_window(hwnd, button_text=SAVE_BUTTON_TEXT, backend=None, fetcher=None, deadline=None):
+    """컨트롤 트리를 한 번만 순회하며 첨부파일 컨트롤과 저장 버튼을 함께 찾음
+
+    EnumChildWindows는 이미 모든 자손을 돌려주므로 재귀 없이 각 HWND를 정확히 한 번씩 조회함
+    컨트롤이 응답하지 않거나 deadline(time.monotonic 기준)을 넘기면 TimeoutError
+    반환값: ([(hwnd, text), ...], 저장 버튼 hwnd 또는 None)
+    """
+    backend = backend or get_window_backend()
+    matched = []
+    button_hwnd = None
+    with get_metrics().time("tree_scan"):
+        for h in [hwnd] + backend.enum_child_windows(hwnd):
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"scan of {hex(hwnd)} exceeded its deadline")
+            text = try_get_text(h, backend, fetcher).strip()
+            if text.endswith(_LABEL_SUFFIXES) and parse_attachment_label(text):
+                matched.append((h, text))
+            elif button_hwnd is None and text == button_text:
+                button_hwnd = h
+    return matched, button_hwnd
+
+def find_controls_by_size_pattern(hwnd, backend=None):
+    matched, _ = scan_message_window(hwnd, backend=backend)
+    return matched
+
+
+def _scan_message_window_recursive(hwnd, button_text=SAVE_BUTTON_TEXT, backend=None):
+    """예전 구현 (벤치마크 비교용): 자식마다 EnumChildWindows로 재귀하고 저장 버튼은 트리를 한 번 더 훑음
+
+    EnumChildWindows가 모든 자손을 돌려주므로 컨트롤은 조상 수만큼 중복 조회됨
+    """
+    backend = backend or get_window_backend()
+    matched = []
+
+    def recurse(h):
+        text = try_get_text(h, backend)
+        if SIZE_PATTERN.search(text):
+            matched.append((h, text.strip()))
+        for ch in backend.enum_child_windows(h):
+            recurse(ch)
+
+    found = []
+
+    def recurse_button(h):
+        if try_get_text(h, backend).strip() == button_text:
+            found.append(h)
+            return
+        for ch in backend.enum_child_windows(h):
+            recurse_button(ch)
+
+    recurse(hwnd)
+    recurse_button(hwnd)
+    return matched, found[0] if found else None
+
+
+def benchmark_scan(attachment_counts=(50, 200), depths=(2, 4, 6), filler_count=20, repeat=3):
+    """--scan-benchmark: 가상 메시지 창 한 번 스캔의 시간(ms)과 백엔드 호출 수를 예전 재귀와 비교"""
+    results = []
+    for attachments in attachment_counts:
+        for depth in depths:
+            backend = FakeWindowBackend()
+            top = build_fake_message_window(backend, attachments, depth=depth, filler_count=filler_count)
+            row = {"attachments": attachments, "depth": depth, "controls": len(backend.windows)}
+            for name, func in (("recursive", lambda: _scan_message_window_recursive(top, backend=backend)),
+                               ("linear", lambda: scan_message_window(top, backend=backend))):
+                backend.reset_counts()
+                matched, button = func()
+                row[f"{name}_calls"] = dict(backend.call_counts)
+                row[f"{name}_matched"] = len(matched)
+                row[f"{name}_ms"] = round(min(_timed(func) for _ in range(repeat)) * 1000, 3)
+            results.append(row)
+    return results
+
+def try_get_text(hwnd, backend=None, fetcher=None):
+    backend = backend or get_window_backend()
+    try:
+        with get_metrics().time("get_text"):
+            if fetcher is not None:
+                return fetcher.get(hwnd, backend)
+            return backend.get_text(hwnd)
+    except TimeoutError:
+        # 창이 응답하지 않음: 나머지 컨트롤도 마찬가지일 것이므로 호출한 쪽에서 스캔을 중단함
+        get_metrics().count("query_timeouts")
+        raise
+    except Exception as e:
+        return f"[ERROR: {e}]"
+
+
+class TextFetcher:
+    """HWND별 컨트롤 텍스트 캐시
+
+    항목은 가져올 때의 세대(generation)를 기억하며, next_generation() 이후에는 다시 가져옴
+    이름 변경/파괴 이벤트를 받으면 invalidate(hwnd)로 해당 항목만 버림
+    이벤트를 놓칠 수 있으므로 max_age초가 지난 항목도 다시 가져옴
+    """
+
+    def __init__(self, backend=None, max_age=2.0, max_entries=4096):
+        self.backend = backend
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def get(self, hwnd, backend=None):
+        """캐시된 텍스트 또는 새로 가져온 텍스트 (조회 실패 시 예외는 그대로 전달)"""
+        now = time.monotonic()
+        entry = self._entries.get(hwnd)
+        if entry is not None and entry[1] == self.generation and now - entry[2] < self.max_age:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        text = (backend or self.backend or get_window_backend()).get_text(hwnd)
+        self._entries[hwnd] = (text, self.generation, now)
+        return text
+
+    def invalidate(self, hwnd=None):
+        if hwnd is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(hwnd, None)
+
+    def next_generation(self):
+        self.generation += 1
+        if len(self._entries) > self.max_entries:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+def click_button(hwnd, backend=None):
+    backend = backend or get_window_backend()
+    log(f"'저장' 버튼 클릭 (HWND: {hex(hwnd)})")
+    get_metrics().count("clicks")
+    with get_metrics().time("click"):
+        backend.click(hwnd)
+
+def click_button_by_text(parent_hwnd, button_text, backend=None):
+    _, button_hwnd = scan_message_window(parent_hwnd, button_text, backend)
+    if button_hwnd is not None:
+        click_button(button_hwnd, backend)
+        return True
+    return False
+
+CACHE_TARGET = "target"
+CACHE_CONTAINER = "container"
+CACHE_SAVE_BUTTON = "save_button"
+
+
+class HandleCache:
+    """대상 창/첨부파일 컨테이너/저장 버튼 HWND 캐시
+
+    저장해둔 핸들은 값싼 확인(창 생존, 클래스 이름, 부모, 텍스트)만 거쳐 재사용하고
+    확인에 실패하면 None을 돌려주어 호출자가 전체 검색을 하도록 함
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or get_window_backend()
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, name, hwnd):
+        if hwnd is None:
+            self.entries.pop(name, None)
+            return
+        self.entries[name] = (hwnd, self.backend.get_class_name(hwnd))
+
+    def get(self, name, parent=None, text=None, title_keywords=None):
+        """유효한 캐시 핸들 또는 None
+
+        parent: 이 창의 자손이어야 함, text: 컨트롤 텍스트가 같아야 함,
+        title_keywords: 창 제목에 이 중 하나가 포함되어야 함
+        """
+        entry = self.entries.get(name)
+        if entry is not None and self._validate(entry, parent, text, title_keywords):
+            self.hits += 1
+            get_metrics().count("handle_cache_hit")
+            return entry[0]
+        if entry is not None:
+            del self.entries[name]
+        self.misses += 1
+        get_metrics().count("handle_cache_miss")
+        return None
+
+    def _validate(self, entry, parent, text, title_keywords):
+        hwnd, class_name = entry
+        backend = self.backend
+        try:
+            if not backend.is_window(hwnd) or backend.get_class_name(hwnd) != class_name:
+                return False
+            if parent is not None and not backend.is_child(parent, hwnd):
+                return False
+            if title_keywords is not None:
+                title = backend.get_window_text(hwnd)
+                if get_title_matcher(title_keywords).rank(title) is None:
+                    return False
+            if text is not None and try_get_text(hwnd, backend).strip() != text:
+                return False
+        except TimeoutError:
+            # 응답 없는 창은 캐시 무효로 보지 않고 호출한 쪽(스캔)에서 처리
+            raise
+        except Exception:
+            return False
+        return True
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(name, None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.entries),
+        }
+
+
+def scan_message_window_cached(hwnd, cache, button_text=SAVE_BUTTON_TEXT, backend=None, fetcher=None,
+                               deadline=None):
+    """캐시된 첨부파일 컨테이너/저장 버튼이 유효하면 컨테이너 하위만 스캔하고, 아니면 전체 스캔
+
+    반환값은 scan_message_window와 같음
+    """
+    backend = backend or get_window_backend()
+    container = cache.get(CACHE_CONTAINER, parent=hwnd)
+    button_hwnd = cache.get(CACHE_SAVE_BUTTON, parent=hwnd, text=button_text)
+    if container is not None and button_hwnd is not None:
+        matched, _ = scan_message_window(container, None, backend, fetcher, deadline)
+        if matched:
+            return matched, button_hwnd
+
+    matched, button_hwnd = scan_message_window(hwnd, button_text, backend, fetcher, deadline)
+    cache.put(CACHE_SAVE_BUTTON, button_hwnd)
+    # 첨부파일 레이블이 모두 같은 부모 아래에 있을 때만 그 부모를 컨테이너로 기억
+    parents = set(backend.get_parent(h) for h, _ in matched)
+    container = parents.pop() if len(parents) == 1 else None
+    cache.put(CACHE_CONTAINER, container if container and container != hwnd else None)
+    return matched, button_hwnd
+
+
+EVENT_CREATED = "created"
+EVENT_DESTROYED = "destroyed"
+EVENT_NAME_CHANGED = "name_changed"
+EVENT_LOCATION_CHANGED = "location_changed"
+EVENT_FOREGROUND = "foreground"
+EVENT_POLL = "poll"
+
+WindowEvent = namedtuple("WindowEvent", ["kind", "hwnd"])
+
+
+class WindowEventSource:
+    """창 변경 이벤트 공급원
+
+    wait(timeout)은 timeout 동안 이벤트를 기다렸다가 쌓인 이벤트를 한꺼번에 돌려줌 (없으면 빈 목록)
+    """
+
+    def __init__(self):
+        self.closed = False
+        self.processes = frozenset()
+        self._queue = queue.Queue()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.closed = True
+
+    def track_processes(self, pids):
+        """창 이벤트를 받을 프로세스 지정 (비어 있으면 모든 프로세스, 감시 스레드에서 호출)"""
+        self.processes = frozenset(pids)
+
+    def post(self, kind, hwnd=None):
+        self._queue.put(WindowEvent(kind, hwnd))
+
+    def wait(self, timeout):
+        events = []
+        try:
+            events.append(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            return events
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+
+class PollingEventSource(WindowEventSource):
+    """이벤트 훅을 쓸 수 없을 때의 폴링 방식 (매 주기마다 EVENT_POLL)"""
+
+    def __init__(self, interval=0.05):
+        super().__init__()
+        self.interval = interval
+
+    def wait(self, timeout=None):
+        time.sleep(self.interval if timeout is None else timeout)
+        return [WindowEvent(EVENT_POLL, None)]
+
+
+class ScriptedEventSource(WindowEventSource):
+    """미리 정해둔 이벤트 묶음을 차례로 돌려주는 가상 이벤트 공급원 (테스트용)
+
+    script의 각 항목은 [(kind, hwnd), ...] 이며 wait() 한 번에 한 묶음씩 반환됨
+    대본을 모두 소비하면 closed가 되어 감시 루프가 종료됨
+    """
+
+    def __init__(self, script, backend=None):
+        super().__init__()
+        self.script = list(script)
+        self.backend = backend
+
+    def wait(self, timeout=None):
+        if not self.script:
+            self.closed = True
+            return []
+        batch = self.script.pop(0)
+        if callable(batch):
+            # 백엔드 트리를 바꾸는 동작을 대본 중간에 끼워넣을 수 있음
+            batch = batch(self.backend) or []
+        return [WindowEvent(kind, hwnd) for kind, hwnd in batch]
+
+
+class WinEventHookSource(WindowEventSource):
+    """SetWinEventHook 기반 이벤트 공급원 (전용 스레드에서 메시지 루프 실행)
+
+    쿨메신저 프로세스를 모를 때는 창 생성/표시/이름 변경을 모든 프로세스에서 받고,
+    track_processes로 프로세스를 알려주면 객체 이벤트 훅을 그 프로세스(idProcess)로만 다시 설치함
+    위치 변경(LOCATIONCHANGE)은 마우스 커서/캐럿 이동마다 모든 프로세스에서 쏟아지므로 추적 중인 프로세스에만 등록함
+    전경 창 변경은 다른 프로그램으로 전환한 것도 알아야 하므로 항상 모든 프로세스에서 받음
+    """
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_SHOW = 0x8002
+    EVENT_OBJECT_HIDE = 0x8003
+    EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    OBJID_CARET = -8
+    OBJID_CURSOR = -9
+    WM_QUIT = 0x0012
+    WM_APP_REHOOK = 0x8000 + 1
+
+    EVENT_KINDS = {
+        EVENT_SYSTEM_FOREGROUND: EVENT_FOREGROUND,
+        EVENT_OBJECT_CREATE: EVENT_CREATED,
+        EVENT_OBJECT_SHOW: EVENT_CREATED,
+        EVENT_OBJECT_DESTROY: EVENT_DESTROYED,
+        EVENT_OBJECT_HIDE: EVENT_DESTROYED,
+        EVENT_OBJECT_LOCATIONCHANGE: EVENT_LOCATION_CHANGED,
+        EVENT_OBJECT_NAMECHANGE: EVENT_NAME_CHANGED,
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.rehooks = 0
+        self._thread = None
+        self._thread_id = None
+        self._error = None
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._thread.start()
+        if not ready.wait(2):
+            raise RuntimeError("WinEvent 훅 스레드 시작 시간 초과")
+        if self._error:
+            raise self._error
+
+    def stop(self):
+        super().stop()
+        if self._thread_id:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+
+    def track_processes(self, pids):
+        pids = frozenset(pids)
+        if pids == self.processes:
+            return
+        super().track_processes(pids)
+        # 훅은 설치한 스레드에서만 해제할 수 있으므로 훅 스레드에 다시 설치를 요청
+        if self._thread_id:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_APP_REHOOK, 0, 0)
+
+    def hook_plan(self, pids=None):
+        """설치할 훅 목록 [(event_min, event_max, idProcess), ...]"""
+        pids = self.processes if pids is None else pids
+        plan = [(self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND, 0)]
+        if not pids:
+            plan.append((self.EVENT_OBJECT_CREATE, self.EVENT_OBJECT_HIDE, 0))
+            plan.append((self.EVENT_OBJECT_NAMECHANGE, self.EVENT_OBJECT_NAMECHANGE, 0))
+        for pid in sorted(pids):
+            plan.append((self.EVENT_OBJECT_CREATE, self.EVENT_OBJECT_HIDE, pid))
+            plan.append((self.EVENT_OBJECT_LOCATIONCHANGE, self.EVENT_OBJECT_NAMECHANGE, pid))
+        return plan
+
+    def _run(self, ready):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        WINEVENTPROC = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.SetWinEventHook.argtypes = [
+            wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WINEVENTPROC,
+            wintypes.DWORD, wintypes.DWORD, wintypes.DWORD
+        ]
+        user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+
+        OBJID_WINDOW = self.OBJID_WINDOW
+        kinds = self.EVENT_KINDS
+
+        def callback(hook, event, hwnd, id_object, id_child, event_thread, event_time):
+            # 커서(OBJID_CURSOR)/캐럿(OBJID_CARET) 등 창이 아닌 객체의 이벤트는 속성 조회 전에 바로 버림
+            # (ctypes 콜백이라 호출 자체는 막을 수 없으므로 훅 범위를 프로세스로 좁혀 호출 수를 줄임)
+            if id_object != OBJID_WINDOW or not hwnd:
+                return
+            kind = kinds.get(event)
+            if kind:
+                self.post(kind, hwnd)
+
+        proc = WINEVENTPROC(callback)
+        hooks = []
+        flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+
+        def install(plan):
+            for h in hooks:
+                user32.UnhookWinEvent(h)
+            hooks.clear()
+            for event_min, event_max, pid in plan:
+                hook = user32.SetWinEventHook(event_min, event_max, None, proc, pid, 0, flags)
+                if not hook:
+                    return ctypes.WinError()
+                hooks.append(hook)
+            return None
+
+        self._error = install(self.hook_plan())
+        if self._error:
+            for h in hooks:
+                user32.UnhookWinEvent(h)
+            ready.set()
+            return
+
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        ready.set()
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            if msg.hwnd is None and msg.message == self.WM_APP_REHOOK:
+                pids = self.processes
+                error = install(self.hook_plan(pids))
+                if error:
+                    # 프로세스가 그 사이 끝났을 수 있음: 모든 프로세스 대상으로 되돌림
+                    log(f"프로세스 {sorted(pids)} 훅 설치 실패, 전체 훅으로 복귀: {error}")
+                    self.processes = frozenset()
+                    install(self.hook_plan(frozenset()))
+                self.rehooks += 1
+                continue
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+
+        for h in hooks:
+            user32.UnhookWinEvent(h)
+
+
+class PollScheduler:
+    """감시 주기 조절기
+
+    변화(새 창, 첨부파일 변경) 직후에는 min_interval로 자주 확인하고,
+    변화가 없으면 backoff 배율로 max_interval까지 점점 늘림
+    메시지 창이 없을 때는 idle_interval에서 시작해 max_idle_interval까지 늘림
+    """
+
+    def __init__(self, min_interval=0.05, max_interval=1.0, backoff=1.5,
+                 idle_interval=0.5, max_idle_interval=2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.idle_interval = idle_interval
+        self.max_idle_interval = max_idle_interval
+        self.interval = min_interval
+        self.wakeups = 0
+        self.changes = 0
+        self.idle_wakeups = 0
+        self._idle = False
+
+    def on_change(self):
+        """변화 감지: 가장 짧은 주기로 복귀"""
+        self.changes += 1
+        self._idle = False
+        self.interval = self.min_interval
+
+    def on_stable(self):
+        """변화 없음: 주기를 점점 늘림"""
+        if self._idle:
+            self._idle = False
+            self.interval = self.min_interval
+        self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def on_idle(self):
+        """메시지 창 없음: 유휴 주기로 점점 늘림"""
+        if not self._idle:
+            self._idle = True
+            self.interval = self.idle_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_idle_interval)
+
+    def wake(self):
+        self.wakeups += 1
+        if self._idle:
+            self.idle_wakeups += 1
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "wakeups": self.wakeups,
+            "idle_wakeups": self.idle_wakeups,
+            "changes": self.changes,
+        }
+
+
+def create_event_source():
+    """가능하면 WinEvent 훅, 실패하면 폴링 방식의 이벤트 공급원을 생성"""
+    if os.name == 'nt':
+        source = WinEventHookSource()
+        try:
+            source.start()
+            log("이벤트 기반 감시 모드")
+            return source
+        except Exception as e:
+            log(f"이벤트 훅 설정 실패, 폴링 방식으로 전환: {e}")
+    source = PollingEventSource(0.05)
+    source.start()
+    log("폴링 감시 모드")
+    return source
+
+class DownloadRequest:
+    """한 메시지 창의 한 첨부파일 묶음에 대한 저장 요청 상태"""
+
+    def __init__(self, hwnd, button_hwnd, filenames, pending, now):
+        self.hwnd = hwnd
+        self.button_hwnd = button_hwnd
+        self.filenames = filenames
+        self.pending = set(pending)
+        self.attempts = 1
+        self.requested_at = now
+        self.next_retry = now
+        self.failed = False
+
+
+class DownloadCoordinator:
+    """'모든파일 저장' 클릭 조정
+
+    메시지 창과 첨부파일 묶음(내용 집합)마다 저장 버튼을 최대 한 번만 누르고,
+    받지 못한 파일이 남아 있으면 timeout 뒤부터 backoff 배율로 간격을 늘리며 max_attempts까지 다시 누름
+    completion(DownloadCompletionTracker)이 있으면 파일이 생긴 것만이 아니라 다 받아졌을 때 받은 것으로 봄
+    다시 누르는 것은 폴더에 아직 없는 파일이 남았을 때뿐 (있지만 크기가 모자란 파일은 실패로만 처리)
+    """
+
+    def __init__(self, download_index, backend=None, timeout=30.0, backoff=2.0, max_attempts=3,
+                 clock=time.monotonic, completion=None):
+        self.download_index = download_index
+        self.completion = completion
+        self.backend = backend
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.requests = {}
+        self.clicks = 0
+        self.completed = 0
+        self.failures = 0
+
+    def _click(self, request):
+        try:
+            click_button(request.button_hwnd, self.backend)
+        except TimeoutError as e:
+            # 응답 없는 창: 클릭이 늦게 처리될 수 있으므로 실패로 보지 않고 재시도 기한까지 기다림
+            log(f"저장 버튼 클릭 응답 없음: {e}")
+        except OSError as e:
+            # 버튼이 그 사이 사라짐: 다음 재시도 기한까지 기다림
+            log(f"저장 버튼 클릭 실패: {e}")
+        self.clicks += 1
+
+    def request(self, hwnd, filenames, button_hwnd):
+        """첨부파일 묶음 중 받지 않은 파일이 있으면 저장 버튼을 누름 (이미 요청한 묶음이면 무시)
+
+        반환값: 이번에 새로 요청한 파일 목록
+        """
+        key = (hwnd, frozenset(filenames))
+        if key in self.requests or button_hwnd is None:
+            return []
+        missing = [f for f in filenames if not self.download_index.exists(f)]
+        if not missing:
+            return []
+        now = self.clock()
+        request = DownloadRequest(hwnd, button_hwnd, key[1], missing, now)
+        request.next_retry = now + self.timeout
+        self.requests[key] = request
+        self._click(request)
+        return missing
+
+    def in_flight(self, hwnd=None):
+        """받는 중인 파일 목록"""
+        result = []
+        for request in self.requests.values():
+            if not request.failed and (hwnd is None or request.hwnd == hwnd):
+                result.extend(request.pending)
+        return result
+
+    def poll(self):
+        """받은 파일을 정리하고 기한이 지난 요청은 다시 시도
+
+        반환값: (이번에 받기를 마친 파일 목록, 이번에 실패 처리된 파일 목록)
+        """
+        done = []
+        failed = []
+        now = self.clock()
+        for request in self.requests.values():
+            if request.failed or not request.pending:
+                continue
+            arrived = [f for f in request.pending if self._arrived(f)]
+            if arrived:
+                request.pending.difference_update(arrived)
+                done.extend(arrived)
+                self.completed += len(arrived)
+                if not request.pending:
+                    continue
+            if now < request.next_retry:
+                continue
+            if not any(not self.download_index.exists(f) for f in request.pending):
+                # 파일은 모두 생겼지만 아직 받는 중이거나 크기가 모자란 채 멈춘 경우:
+                # 다시 누르면 모든 첨부파일이 '이름 (1).확장자'로 또 받아지므로 누르지 않음
+                stalled = [f for f in request.pending if self._stalled(f)]
+                if stalled:
+                    request.pending.difference_update(stalled)
+                    self.failures += len(stalled)
+                    failed.extend(stalled)
+                continue
+            if request.attempts >= self.max_attempts:
+                request.failed = True
+                self.failures += len(request.pending)
+                failed.extend(request.pending)
+                continue
+            request.attempts += 1
+            request.next_retry = now + self.timeout * (self.backoff ** (request.attempts - 1))
+            log(f"다운로드 재시도 {request.attempts}/{self.max_attempts}: {len(request.pending)}개 파일")
+            self._click(request)
+        return done, failed
+
+    def _arrived(self, filename):
+        if self.completion is not None:
+            return self.completion.is_complete(filename)
+        return self.download_index.exists(filename)
+
+    def _stalled(self, filename):
+        if self.completion is None:
+            return False
+        progress = self.completion.progress(filename)
+        return progress is not None and progress.state == DOWNLOAD_INCOMPLETE
+
+    def forget(self, hwnd):
+        """닫힌 메시지 창의 요청 기록 삭제"""
+        for key in [key for key in self.requests if key[0] == hwnd]:
+            del self.requests[key]
+
+    def stats(self):
+        return {
+            "requests": len(self.requests),
+            "in_flight": len(self.in_flight()),
+            "clicks": self.clicks,
+            "completed": self.completed,
+            "failures": self.failures,
+        }
+
 
-def extract_filename(text):
-    match = SIZE_PATTERN.search(text)
-    if match:
-        return text[:match.start()].strip()
-    return text.strip()
+UI_WINDOW_FOUND = "window_found"
+UI_WINDOW_LOST = "window_lost"
+UI_FILES_CHANGED = "files_changed"
+UI_POSITION_CHANGED = "position_changed"
+UI_STATUS = "status"
+UI_FILES_UPDATED = "files_updated"
 
-def log(msg):
-    timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S.%f]")[:-3]
-    print(f"{timestamp} {msg}")
+# 마지막 값만 의미가 있어 한 묶음 안에서 합칠 수 있는 이벤트
+COALESCED_UI_EVENTS = (UI_FILES_CHANGED, UI_POSITION_CHANGED, UI_STATUS)
 
-def find_window_by_title_keyword(keywords):
-    result = []
-    for keyword in keywords:
-        def callback(hwnd, _):
-            if keyword in win32gui.GetWindowText(hwnd):
-                result.append(hwnd)
-        win32gui.EnumWindows(callback, None)
 
-    return result
+class UiUpdateQueue:
+    """감시 스레드 -> Tk 메인 스레드 UI 갱신 큐
 
-def find_controls_by_size_pattern(hwnd):
-    matched = []
-    def recurse(h):
-        text = try_get_text(h)
-        if SIZE_PATTERN.search(text):
-            matched.append((h, text.strip()))
-        children = []
-        win32gui.EnumChildWindows(h, lambda ch, param: param.append(ch), children)
-        for ch in children:
-            recurse(ch)
-    recurse(hwnd)
-    return matched
+    감시 스레드는 publish()만 호출하고, Tk 스레드가 after()로 drain()하여 한 묶음씩 처리함
+    """
 
-def try_get_text(hwnd):
-    try:
-        length = win32gui.SendMessage(hwnd, win32con.WM_GETTEXTLENGTH)
-        if length == 0:
-            return ""
-        buffer = win32gui.PyMakeBuffer((length + 1) * 2)
-        win32gui.SendMessage(hwnd, win32con.WM_GETTEXT, length + 1, buffer)
-        return buffer[:].tobytes().decode("utf-16", errors="ignore").rstrip("\x00")
-    except Exception as e:
-        return f"[ERROR: {e}]"
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.drains = 0
+        self.max_depth = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    def publish(self, kind, payload=None):
+        self._queue.put((kind, payload, time.perf_counter()))
+        self._ready.set()
+        self.published += 1
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def wait(self, timeout=None):
+        """이벤트가 들어올 때까지 대기 (Tk 없이 소비하는 헤드리스 모드에서 drain() 전에 사용)"""
+        ready = self._ready.wait(timeout)
+        self._ready.clear()
+        return ready
+
+    def drain(self, max_items=500):
+        """쌓인 이벤트를 꺼내 (kind, payload) 목록으로 반환
+
+        같은 종류의 위치/상태/파일 목록 이벤트는 마지막 것만 남김
+        """
+        batch = []
+        while len(batch) < max_items:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return []
+
+        now = time.perf_counter()
+        self.drains += 1
+        self.last_latency = now - batch[0][2]
+        self.max_latency = max(self.max_latency, self.last_latency)
+        self._total_latency += self.last_latency
+
+        last_index = {}
+        for i, (kind, _, _) in enumerate(batch):
+            if kind in COALESCED_UI_EVENTS:
+                last_index[kind] = i
+        events = []
+        for i, (kind, payload, _) in enumerate(batch):
+            if kind in COALESCED_UI_EVENTS and last_index[kind] != i:
+                self.coalesced += 1
+                continue
+            events.append((kind, payload))
+        self.delivered += len(events)
+        return events
+
+    def stats(self):
+        return {
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "drains": self.drains,
+            "last_latency_ms": self.last_latency * 1000,
+            "max_latency_ms": self.max_latency * 1000,
+            "avg_latency_ms": self._total_latency / self.drains * 1000 if self.drains else 0.0,
+        }
 
-def click_button_by_text(parent_hwnd, button_text):
-    found = []
-    def recurse(hwnd):
-        if try_get_text(hwnd).strip() == button_text:
-            found.append(hwnd)
-            return
-        children = []
-        win32gui.EnumChildWindows(hwnd, lambda ch, param: param.append(ch), children)
-        for ch in children:
-            recurse(ch)
-    recurse(parent_hwnd)
-    if found:
-        log(f"'저장' 버튼 클릭 (HWND: {hex(found[0])})")
-        win32gui.SendMessage(found[0], win32con.BM_CLICK, 0, 0)
-        return True
-    return False
 
 class RoundedFrame(tk.Canvas):
     def __init__(self, parent, bg='#FFFFFF', width=200, height=100, corner_radius=10, **kwargs):
@@ -296,12 +2583,15 @@ class FileItem(tk.Frame):
         name_frame.bind("<Enter>", self._on_enter)
         name_frame.bind("<Leave>", self._on_leave)
         name_frame.bind("<Double-1>", self._on_double_click)
+        # 폭이 정해지거나 바뀌면 그 폭에 맞게 파일명을 다시 줄임
+        name_frame.bind("<Configure>", self._on_name_resize)
+        self.name_frame = name_frame
         
-        # 파일명 표시 레이블 - 줄바꿈 허용 및 넓이 제한
+        # 파일명 표시 레이블 - 가상 목록의 행 높이가 고정이므로 줄바꿈 없이 한 줄로, 폭에 맞춰 가운데를 줄임
+        self.name_font = tkfont.Font(self, font=("Malgun Gothic", 10))
         self.name_label = tk.Label(name_frame, text=self._truncate_filename(filename, 50), 
-                                  font=("Malgun Gothic", 10), 
-                                  anchor="w", bg=theme.current['bg'], fg=theme.current['fg'],
-                                  wraplength=280)  # 줄바꿈 길이 설정
+                                  font=self.name_font, 
+                                  anchor="w", bg=theme.current['bg'], fg=theme.current['fg'])
         self.name_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
         self.name_label.bind("<Enter>", self._on_enter)
         self.name_label.bind("<Leave>", self._on_leave)
@@ -337,7 +2627,43 @@ class FileItem(tk.Frame):
         self.bind("<Enter>", self._on_enter)
         self.bind("<Leave>", self._on_leave)
         self.bind("<Double-1>", self._on_double_click)
+
+        for widget in (self, self.icon_label, info_frame, name_frame, self.name_label,
+                       meta_frame, self.size_label, self.time_label):
+            widget.bind("<Button-3>", self._on_right_click)
     
+    def bind_file(self, filename, filepath):
+        """재사용되는 행에 다른 파일 정보를 연결"""
+        if filename == self.filename and filepath == self.filepath:
+            return
+        self._hide_tooltip(None)
+        self.filename = filename
+        self.filepath = filepath
+        self.icon_label.config(text=get_file_icon(filename))
+        self.name_label.config(text=self._fit_filename(filename, self.name_frame.winfo_width()))
+        self.update_file_info()
+
+    def _on_name_resize(self, event):
+        self.name_label.config(text=self._fit_filename(self.filename, event.width))
+
+    def _fit_filename(self, filename, width):
+        """width 픽셀 안에 한 줄로 들어가도록 가운데를 줄인 파일명 (아직 배치 전이면 50자 기준)"""
+        if width <= 1:
+            return self._truncate_filename(filename, 50)
+        # 레이블 안쪽 여백(padx/테두리) 몫
+        width -= 6
+        if self.name_font.measure(filename) <= width:
+            return filename
+        # 폭에 들어가는 가장 긴 max_length를 이분 탐색
+        low, high = 5, len(filename) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.name_font.measure(self._truncate_filename(filename, middle)) <= width:
+                low = middle
+            else:
+                high = middle - 1
+        return self._truncate_filename(filename, low)
+
     def _truncate_filename(self, filename, max_length=40):
         """긴 파일명을 최대 길이로 제한하고 필요시 말줄임표 추가"""
         if len(filename) <= max_length:
@@ -349,7 +2675,7 @@ class FileItem(tk.Frame):
         """마우스 오버시 전체 파일명 표시"""
         self._on_enter(event)  # 기존 이벤트 처리
         
-        if len(self.filename) > 40:  # 파일명이 길 경우에만 툴팁 표시
+        if self.name_label.cget("text") != self.filename:  # 파일명이 줄여서 표시된 경우에만 툴팁 표시
             x, y = event.x_root, event.y_root
             
             # 기존 툴팁 제거
@@ -380,14 +2706,37 @@ class FileItem(tk.Frame):
     
     def update_file_info(self):
         try:
-            if os.path.exists(self.filepath):
-                file_size = os.path.getsize(self.filepath)
-                mod_time = os.path.getmtime(self.filepath)
+            index = get_download_index()
+            if not index.ready:
+                # 첫 폴더 읽기가 끝나면 UI_FILES_UPDATED로 다시 표시됨 (UI 스레드에서는 기다리지 않음)
+                self.size_label.config(text="확인 중")
+                self.time_label.config(text="")
+                return
+            info = index.get(self.filename) if self.filename else None
+            progress = get_completion_tracker().progress(self.filename) if info else None
+            if progress and progress.state != DOWNLOAD_COMPLETE:
+                # 받는 중이거나 중간에 멈춘 파일: 진행률과 전송 속도 표시
+                if progress.expected:
+                    percent = min(99, int(progress.size * 100 / progress.expected))
+                    size_str = f"{format_size(progress.size)} / {format_size(progress.expected)} ({percent}%)"
+                else:
+                    size_str = f"{format_size(progress.size)} 받는 중"
+                self.size_label.config(text=size_str)
+                if progress.state == DOWNLOAD_INCOMPLETE:
+                    self.time_label.config(text="다운로드 중단됨")
+                elif progress.rate:
+                    self.time_label.config(text=f"{format_size(int(progress.rate))}/s")
+                else:
+                    self.time_label.config(text="받는 중")
+            elif info:
+                file_size, mod_time = info
                 
                 size_str = format_size(file_size)
                 self.size_label.config(text=size_str)
                 
                 time_str = datetime.fromtimestamp(mod_time).strftime("%Y-%m-%d %H:%M")
+                if get_duplicate_finder().original_of(self.filename):
+                    time_str += "  · 중복"
                 self.time_label.config(text=time_str)
             else:
                 self.size_label.config(text="다운로드 필요")
@@ -423,11 +2772,200 @@ class FileItem(tk.Frame):
         # 툴팁 제거
         self._hide_tooltip(None)
     
+    def _on_right_click(self, event):
+        """중복 파일이면 정리 메뉴 표시"""
+        original = get_duplicate_finder().original_of(self.filename)
+        if not original:
+            return
+        menu = tk.Menu(self, tearoff=0)
+        menu.add_command(label=f"원본: {self._truncate_filename(original, 40)}", state=tk.DISABLED)
+        menu.add_separator()
+        menu.add_command(label="원본과 하드 링크로 합치기", command=lambda: self._resolve_duplicate("link"))
+        menu.add_command(label="중복 파일 삭제", command=lambda: self._resolve_duplicate("remove"))
+        menu.tk_popup(event.x_root, event.y_root)
+
+    def _resolve_duplicate(self, action):
+        finder = get_duplicate_finder()
+        if action == "remove" and not messagebox.askyesno("중복 파일 삭제", f"'{self.filename}' 파일을 삭제할까요?"):
+            return
+        try:
+            if action == "link":
+                done = finder.link_duplicate(self.filename)
+            else:
+                done = finder.remove_duplicate(self.filename)
+        except OSError as e:
+            messagebox.showerror("오류", f"중복 파일 정리 실패: {e}")
+            return
+        if not done:
+            messagebox.showwarning("중복 파일", "원본과 내용이 달라져 정리하지 않았습니다.")
+
     def _on_double_click(self, event):
-        if os.path.exists(self.filepath):
-            os.startfile(self.filepath)
-        else:
+        # UI 스레드이므로 인덱스의 첫 폴더 읽기를 기다리지 않음: 존재 여부는 파일 하나만 직접 확인
+        if not os.path.exists(self.filepath):
             messagebox.showerror("오류", "파일이 존재하지 않습니다.")
+            return
+        index = get_download_index()
+        in_index_folder = (os.path.normcase(os.path.dirname(os.path.abspath(self.filepath))) ==
+                           os.path.normcase(os.path.abspath(index.path)))
+        # 받는 중인지 여부는 인덱스가 준비된 뒤, 현재 다운로드 폴더의 파일에 대해서만 알 수 있음
+        if index.ready and in_index_folder:
+            progress = get_completion_tracker().progress(self.filename)
+            if (progress and progress.state != DOWNLOAD_COMPLETE and
+                    not messagebox.askyesno("다운로드 중", "아직 다 받지 못한 파일입니다. 그래도 열까요?")):
+                return
+        os.startfile(self.filepath)
+
+class VirtualFileList:
+    """보이는 행만 FileItem을 만드는 가상화 파일 목록
+
+    고정 높이 행을 Canvas 위에 배치하고, 스크롤 시 행 위젯을 재사용하여 다른 파일에 다시 연결함
+    위젯 수는 파일 개수와 무관하게 (보이는 행 수 + 여유 행) 정도로 유지됨
+    행 높이가 고정이므로 FileItem의 파일명은 줄바꿈 없이 한 줄로 표시함 (폭에 맞춰 가운데를 줄임)
+    """
+
+    def __init__(self, canvas, theme, row_height=64, row_gap=2, overscan=2):
+        self.canvas = canvas
+        self.theme = theme
+        self.row_height = row_height
+        self.row_step = row_height + row_gap
+        self.overscan = overscan
+        self.files = []
+        self.paths = {}
+        self.pool = []
+        self.width = 1
+        self.canvas.configure(yscrollincrement=self.row_step // 2)
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, filename):
+        return filename in self.files
+
+    def set_files(self, filenames, paths=None):
+        """표시할 파일 목록 설정 (paths: 파일명별 전체 경로, 없으면 현재 다운로드 폴더 기준)"""
+        self.files = list(dict.fromkeys(filenames))
+        self.paths = paths or {}
+        self.canvas.configure(scrollregion=(0, 0, self.width, len(self.files) * self.row_step))
+        self.refresh()
+
+    def resize(self, width):
+        self.width = width
+        for _, window_id in self.pool:
+            self.canvas.itemconfig(window_id, width=width)
+        self.canvas.configure(scrollregion=(0, 0, width, len(self.files) * self.row_step))
+        self.refresh()
+
+    def visible_range(self):
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.row_step)
+        first = max(int(top // self.row_step) - self.overscan, 0)
+        last = min(int((top + height) // self.row_step) + self.overscan + 1, len(self.files))
+        return first, last
+
+    def _ensure_pool(self, size):
+        while len(self.pool) < size:
+            item = FileItem(self.canvas, "", "", self.theme)
+            window_id = self.canvas.create_window(0, -self.row_step, window=item, anchor="nw",
+                                                  width=self.width, height=self.row_height)
+            self.pool.append((item, window_id))
+
+    def refresh(self):
+        """현재 스크롤 위치에 보이는 행만 배치/연결"""
+        first, last = self.visible_range()
+        # 최소 필요 개수만큼 풀을 유지 (인덱스 % 풀 크기로 행을 고정 배정해 스크롤 시 한 행만 다시 연결됨)
+        self._ensure_pool(last - first)
+        pool_size = len(self.pool)
+        used = set()
+        for index in range(first, last):
+            slot = index % pool_size
+            item, window_id = self.pool[slot]
+            filename = self.files[index]
+            filepath = self.paths.get(filename) or os.path.join(get_download_path(), filename)
+            item.bind_file(filename, filepath)
+            self.canvas.coords(window_id, 0, index * self.row_step)
+            used.add(slot)
+        for slot, (item, window_id) in enumerate(self.pool):
+            if slot not in used:
+                self.canvas.coords(window_id, 0, -self.row_step)
+
+    def visible_items(self):
+        """현재 화면에 연결된 FileItem 목록"""
+        first, last = self.visible_range()
+        if not self.pool:
+            return []
+        return [self.pool[index % len(self.pool)][0] for index in range(first, last)]
+
+    def widget_count(self):
+        return len(self.pool)
+
+
+def _build_file_list_packed(parent, filenames, theme):
+    """예전 구현 (벤치마크 비교용): 파일마다 FileItem을 만들어 한 프레임에 pack"""
+    frame = tk.Frame(parent, bg=theme.current['bg'])
+    for filename in filenames:
+        FileItem(frame, filename, os.path.join(get_download_path(), filename), theme).pack(fill=tk.X, pady=2)
+    return frame
+
+
+def _count_widgets(widget):
+    return sum(1 + _count_widgets(child) for child in widget.winfo_children())
+
+
+def benchmark_file_list(counts=(50, 500, 5000), scroll_steps=20):
+    """--list-benchmark: 파일 목록 구성 시간(ms), 위젯 수, 스크롤 한 번당 시간(ms)을 예전 pack 방식과 비교
+
+    패널과 같은 380x450 캔버스에 목록을 만들고 update_idletasks까지 포함해 잼
+    스크롤은 목록 처음부터 끝까지 scroll_steps번에 나눠 이동한 평균
+    """
+    root = tk.Tk()
+    root.geometry("380x450")
+    theme = Theme()
+    results = []
+    try:
+        for count in counts:
+            filenames = [f"첨부파일_{i:05d}.hwp" for i in range(count)]
+            row = {"files": count}
+
+            canvas = tk.Canvas(root, width=380, height=450, highlightthickness=0)
+            canvas.pack(fill=tk.BOTH, expand=True)
+            root.update()
+            started = time.perf_counter()
+            frame = _build_file_list_packed(canvas, filenames, theme)
+            canvas.create_window((0, 0), window=frame, anchor="nw", width=380)
+            root.update_idletasks()
+            canvas.configure(scrollregion=canvas.bbox("all"))
+            row["packed_build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            row["packed_widgets"] = _count_widgets(canvas)
+            started = time.perf_counter()
+            for step in range(1, scroll_steps + 1):
+                canvas.yview_moveto(step / scroll_steps)
+                root.update_idletasks()
+            row["packed_scroll_ms"] = round((time.perf_counter() - started) * 1000 / scroll_steps, 2)
+            canvas.destroy()
+
+            canvas = tk.Canvas(root, width=380, height=450, highlightthickness=0)
+            canvas.pack(fill=tk.BOTH, expand=True)
+            root.update()
+            started = time.perf_counter()
+            file_list = VirtualFileList(canvas, theme)
+            file_list.resize(380)
+            file_list.set_files(filenames)
+            root.update_idletasks()
+            row["virtual_build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            row["virtual_rows"] = file_list.widget_count()
+            row["virtual_widgets"] = _count_widgets(canvas)
+            started = time.perf_counter()
+            for step in range(1, scroll_steps + 1):
+                canvas.yview_moveto(step / scroll_steps)
+                file_list.refresh()
+                root.update_idletasks()
+            row["virtual_scroll_ms"] = round((time.perf_counter() - started) * 1000 / scroll_steps, 2)
+            canvas.destroy()
+            results.append(row)
+    finally:
+        root.destroy()
+    return results
+
 
 class FileManagerGUI:
     def __init__(self):
@@ -457,6 +2995,36 @@ class FileManagerGUI:
             except Exception as e:
                 print(f"윈도우 효과 설정 실패: {e}")
         
+        self.x = 0
+        self.y = 0    
+
+        self.current_files = []
+        self.searching = False
+        self.panel_built = False
+        self.pending_status = "준비됨"
+
+        self.ui_queue = UiUpdateQueue()
+        # 큐가 비어 있으면 확인 간격을 ui_drain_idle_max까지 두 배씩 늘리고, 이벤트가 오면 다시 줄임
+        self.ui_drain_interval = 30
+        self.ui_drain_idle_max = 250
+        self.ui_drain_delay = self.ui_drain_interval
+        self.window.after(self.ui_drain_delay, self.process_ui_events)
+        get_metrics().add_source("ui_queue", lambda: dict(self.ui_queue.stats(),
+                                                          drain_interval_ms=self.ui_drain_delay))
+
+        self.stats_window = None
+        self.stats_after_id = None
+        self.metrics_dump_interval = 10 * 60 * 1000
+        if get_metrics().enabled:
+            self.window.after(self.metrics_dump_interval, self.periodic_metrics_dump)
+
+    def build_panel(self):
+        """패널 위젯 구성 (로그인 직후 시작 시간을 줄이기 위해 첫 메시지 창을 찾았을 때 한 번만 만듦)"""
+        if self.panel_built:
+            return
+        self.panel_built = True
+        from tkinter import ttk
+
         self.title_frame = tk.Frame(self.window, bg=self.theme.current['bg'], height=30)
         self.title_frame.pack(fill=tk.X, pady=(0, 5))
         self.title_frame.bind("<ButtonPress-1>", self.start_move)
@@ -468,6 +3036,7 @@ class FileManagerGUI:
                                     bg=self.theme.current['bg'], 
                                     fg=self.theme.current['fg'])
         self.title_label.pack(side=tk.LEFT, padx=10)
+        self.title_label.bind("<Double-Button-1>", self.toggle_stats_view)
 
         self.button_frame = tk.Frame(self.title_frame, bg=self.theme.current['bg'])
         self.button_frame.pack(side=tk.RIGHT, padx=5)
@@ -498,6 +3067,17 @@ class FileManagerGUI:
         self.separator = ttk.Separator(self.window, orient='horizontal')
         self.separator.pack(fill=tk.X, padx=10)
 
+        # 첨부파일 기록 검색창
+        self.search_frame = tk.Frame(self.window, bg=self.theme.current['bg'])
+        self.search_frame.pack(fill=tk.X, padx=10, pady=(8, 0))
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(self.search_frame, textvariable=self.search_var,
+                                     font=("Malgun Gothic", 9), relief="flat",
+                                     bg=self.theme.current['button_bg'], fg=self.theme.current['fg'])
+        self.search_entry.pack(fill=tk.X, ipady=3)
+        self.search_var.trace_add("write", self._on_search_changed)
+        self.search_after_id = None
+
         self.container_frame = tk.Frame(self.window, bg=self.theme.current['bg'])
         self.container_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
@@ -509,28 +3089,112 @@ class FileManagerGUI:
                                highlightthickness=0)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        self.scrollbar.config(command=self.canvas.yview)
-
-        self.files_frame = tk.Frame(self.canvas, bg=self.theme.current['bg'])
-        self.canvas_window = self.canvas.create_window((0, 0), window=self.files_frame, anchor="nw")
+        self.scrollbar.config(command=self._on_scrollbar)
 
-        self.files_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        self.file_list = VirtualFileList(self.canvas, self.theme)
         self.canvas.bind("<Configure>", self.on_canvas_resize)
 
         self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
         self.status_frame = tk.Frame(self.window, bg=self.theme.current['bg'], height=25)
         self.status_frame.pack(fill=tk.X, side=tk.BOTTOM)
         
-        self.status_label = tk.Label(self.status_frame, text="준비됨", 
+        self.status_label = tk.Label(self.status_frame, text=self.pending_status, 
                                     font=("Malgun Gothic", 8),
                                     bg=self.theme.current['bg'], 
                                     fg="#888888", anchor="w")
         self.status_label.pack(side=tk.LEFT, padx=10)
         
-        self.file_items = []
-        
-        self.x = 0
-        self.y = 0    
+        # 다운로드가 끝나면 해당 행이 스스로 갱신되도록 폴더 인덱스 변경을 구독
+        get_download_index().add_listener(lambda names: self.ui_queue.publish(UI_FILES_UPDATED, names))
+        get_duplicate_finder().add_listener(lambda names: self.ui_queue.publish(UI_FILES_UPDATED, names))
+        get_completion_tracker().add_listener(lambda names: self.ui_queue.publish(UI_FILES_UPDATED, names))
+
+    def process_ui_events(self):
+        """감시 스레드가 보낸 UI 갱신을 Tk 스레드에서 한 묶음씩 적용"""
+        events = self.ui_queue.drain()
+        if events:
+            self.ui_drain_delay = self.ui_drain_interval
+        else:
+            self.ui_drain_delay = min(self.ui_drain_delay * 2, self.ui_drain_idle_max)
+        try:
+            for kind, payload in events:
+                if kind == UI_WINDOW_FOUND:
+                    self.build_panel()
+                elif not self.panel_built:
+                    # 패널이 아직 없으면 상태 문구만 보관하고 나머지는 창을 찾은 뒤의 갱신에 맡김
+                    if kind == UI_STATUS:
+                        self.pending_status = payload
+                    continue
+                if kind == UI_WINDOW_FOUND:
+                    self.attach_to_window(payload)
+                    self.window.deiconify()
+                elif kind == UI_WINDOW_LOST:
+                    self.window.withdraw()
+                    self.clear_files()
+                elif kind == UI_FILES_CHANGED:
+                    self.sync_files(payload)
+                elif kind == UI_POSITION_CHANGED:
+                    self.attach_to_window(payload)
+                elif kind == UI_STATUS:
+                    self.update_status(payload)
+                elif kind == UI_FILES_UPDATED:
+                    self.refresh_file_info(payload)
+        except Exception as e:
+            print(f"UI 갱신 오류: {e}")
+        self.window.after(self.ui_drain_delay, self.process_ui_events)
+
+    def toggle_stats_view(self, event=None):
+        """숨겨진 계측 통계 창 (패널 제목 더블클릭, 열려 있는 동안은 계측을 켬)"""
+        if self.stats_window is not None:
+            self.close_stats_view()
+            return
+        metrics = get_metrics()
+        self.stats_was_enabled = metrics.enabled
+        metrics.enabled = True
+
+        self.stats_window = tk.Toplevel(self.window)
+        self.stats_window.title("계측 통계")
+        self.stats_window.attributes("-topmost", True)
+        self.stats_window.protocol("WM_DELETE_WINDOW", self.close_stats_view)
+        self.stats_text = tk.Text(self.stats_window, width=64, height=20, font=("Consolas", 9),
+                                  bg=self.theme.current['bg'], fg=self.theme.current['fg'], relief="flat")
+        self.stats_text.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        stats_buttons = tk.Frame(self.stats_window)
+        stats_buttons.pack(fill=tk.X, padx=8, pady=(0, 8))
+        tk.Button(stats_buttons, text="초기화", relief="flat", command=metrics.reset).pack(side=tk.LEFT)
+        tk.Button(stats_buttons, text="파일로 저장", relief="flat", command=self.dump_metrics).pack(side=tk.RIGHT)
+        self.refresh_stats_view()
+
+    def refresh_stats_view(self):
+        self.stats_text.config(state=tk.NORMAL)
+        self.stats_text.delete("1.0", tk.END)
+        self.stats_text.insert(tk.END, get_metrics().format())
+        self.stats_text.config(state=tk.DISABLED)
+        self.stats_after_id = self.window.after(1000, self.refresh_stats_view)
+
+    def close_stats_view(self):
+        if self.stats_after_id:
+            self.window.after_cancel(self.stats_after_id)
+            self.stats_after_id = None
+        self.stats_window.destroy()
+        self.stats_window = None
+        get_metrics().enabled = self.stats_was_enabled
+
+    def dump_metrics(self):
+        try:
+            path = get_metrics().dump()
+        except OSError as e:
+            self.update_status(f"통계 저장 실패: {e}")
+            return
+        self.update_status(f"통계 저장: {path}")
+
+    def periodic_metrics_dump(self):
+        """COOLMSG_METRICS=1로 실행 중이면 주기적으로 통계를 파일에 남김"""
+        try:
+            get_metrics().dump()
+        except OSError as e:
+            print(f"통계 저장 실패: {e}")
+        self.window.after(self.metrics_dump_interval, self.periodic_metrics_dump)
 
     def check_updates(self):
         """업데이트 확인 대화상자 표시"""
@@ -550,12 +3214,11 @@ class FileManagerGUI:
 
         self.container_frame.configure(bg=self.theme.current['bg'])
         self.canvas.configure(bg=self.theme.current['bg'])
-        self.files_frame.configure(bg=self.theme.current['bg'])
 
         self.status_frame.configure(bg=self.theme.current['bg'])
         self.status_label.configure(bg=self.theme.current['bg'])
 
-        for item in self.file_items:
+        for item, _ in self.file_list.pool:
             item.theme = self.theme
             item._on_leave(None)
     
@@ -577,29 +3240,85 @@ class FileManagerGUI:
             self.window.geometry(f"+{x}+{y}")
     
     def on_canvas_resize(self, event):
-        self.canvas.itemconfig(self.canvas_window, width=event.width)
+        self.file_list.resize(event.width)
     
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self.file_list.refresh()
+
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        self.file_list.refresh()
     
     def update_status(self, message):
         self.status_label.config(text=message)
     
+    def refresh_file_info(self, filenames):
+        """다운로드 폴더에서 바뀐 파일의 행만 다시 표시"""
+        changed = set(os.path.normcase(name) for name in filenames)
+        for item in self.file_list.visible_items():
+            if os.path.normcase(item.filename) in changed:
+                item.update_file_info()
+
     def clear_files(self):
-        for item in self.file_items:
-            item.destroy()
-        self.file_items = []
-    
+        self.current_files = []
+        if not self.searching:
+            self.file_list.set_files([])
+            self.canvas.yview_moveto(0)
+
     def add_file(self, filename):
-        filepath = os.path.join(DOWNLOAD_PATH, filename)
-        file_item = FileItem(self.files_frame, filename, filepath, self.theme)
-        file_item.pack(fill=tk.X, pady=2)
-        self.file_items.append(file_item)
-        
-        self.files_frame.update_idletasks()
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        if filename in self.current_files:
+            return
+        self.sync_files(self.current_files + [filename])
+
+    def sync_files(self, filenames):
+        """파일 목록을 filenames와 같게 맞춤
+
+        기존 항목은 순서를 유지한 채 사라진 항목만 빼고 새 항목을 뒤에 붙인 뒤 한 번만 다시 배치함
+        검색 결과를 보는 중이면 목록만 기억해두고 검색을 지울 때 반영함
+        """
+        added, removed = diff_attachments(self.current_files, filenames)
+        if not added and not removed:
+            return
+        removed = set(removed)
+        self.current_files = [f for f in self.current_files if f not in removed] + added
+        if not self.searching:
+            with get_metrics().time("ui_rebuild"):
+                self.file_list.set_files(self.current_files)
+
+    def _on_search_changed(self, *args):
+        # 입력이 잠시 멈췄을 때만 검색
+        if self.search_after_id:
+            self.window.after_cancel(self.search_after_id)
+        self.search_after_id = self.window.after(150, self.run_search)
+
+    def run_search(self):
+        """첨부파일 기록 검색 결과를 목록에 표시 (검색어가 없으면 현재 창 파일 목록)"""
+        self.search_after_id = None
+        query = self.search_var.get().strip()
+        if not query:
+            self.searching = False
+            self.file_list.set_files(self.current_files)
+            self.canvas.yview_moveto(0)
+            return
+        try:
+            start = time.perf_counter()
+            rows = get_attachment_history().search(query)
+            elapsed = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            self.update_status(f"검색 실패: {e}")
+            return
+        self.searching = True
+        # 기록 결과는 당시 기록된 경로(download_path)에서 열어야 함 (다운로드 폴더가 바뀌었을 수 있음)
+        paths = {}
+        for row in rows:
+            paths.setdefault(row[0], row[4])
+        self.file_list.set_files([row[0] for row in rows], paths)
+        self.canvas.yview_moveto(0)
+        self.update_status(f"기록 검색: {len(rows)}건 ({elapsed:.1f}ms)")
     
     def attach_to_window(self, hwnd):
+        started = time.perf_counter()
         try:
             rect = win32gui.GetWindowRect(hwnd)
             target_right = rect[2]
@@ -656,6 +3375,8 @@ class FileManagerGUI:
                 
         except Exception as e:
             print(f"attach_to_window error: {e}")
+        finally:
+            get_metrics().record("position_update", time.perf_counter() - started)
 
     def get_monitor_info(self):
         monitors = []
@@ -726,69 +3447,715 @@ class FileManagerGUI:
         current_y = self.window.winfo_y()
         target_x, target_y = self.target_window_pos
 
-        diff_x = target_x - current_x
-        diff_y = target_y - current_y
+        diff_x = target_x - current_x
+        diff_y = target_y - current_y
+
+        if abs(diff_x) < 2 and abs(diff_y) < 2:
+            self.window.geometry(f"380x500+{target_x}+{target_y}")
+            self.animation_id = None
+            return
+
+        new_x = current_x + diff_x // 5
+        new_y = current_y + diff_y // 5
+
+        self.window.geometry(f"380x500+{new_x}+{new_y}")
+
+        self.animation_id = self.window.after(16, self.animate_window_position) 
+
+class MessageWindowState:
+    """감시 중인 메시지 창 하나의 스캔 상태"""
+
+    def __init__(self, hwnd, backend):
+        self.hwnd = hwnd
+        self.cache = HandleCache(backend)
+        self.cache.put(CACHE_TARGET, hwnd)
+        self.texts = []
+        self.labels = []
+        self.filenames = []
+        self.known_controls = set()
+        self.need_scan = True
+        self.scans = 0
+        self.timeouts = 0
+        self.quarantined_until = 0.0
+        self.last_scan_ms = 0.0
+        self.pid = None
+
+
+class MessageWatcher:
+    """열려 있는 모든 메시지 창을 감시 (UI 변경은 ui_queue로만 전달)
+
+    창마다 스캔 상태와 다운로드 요청을 따로 관리하고, 한 번 깨어날 때 최대 max_scans_per_wake개 창만
+    전경 창 우선 + 순환 순서로 스캔하여 창이 N개면 비용도 대략 N배에 머물도록 함
+    패널은 전경에 있는 메시지 창(없으면 마지막으로 보던 창)을 따라감
+
+    이벤트 모드에서는 창이나 그 하위 컨트롤에 변화가 있을 때만 다시 스캔하고,
+    이벤트가 resync_interval 동안 없으면 누락 대비로 한 번 전체 확인함
+    폴링 모드(PollingEventSource)에서는 scheduler가 정한 주기로 확인함
+
+    창이 응답하지 않으면(TimeoutError, 한 번의 스캔이 scan_budget초 초과 포함) 그 창은 격리하여
+    quarantine_base초부터 두 배씩 quarantine_max초까지 늘려가며 다시 시도하고, 그동안은 마지막으로 알던 목록을 유지함
+    """
+
+    def __init__(self, ui_queue, event_source=None, backend=None, resync_interval=5.0, scheduler=None,
+                 download_index=None, coordinator=None, max_scans_per_wake=2, discovery_interval=1.0,
+                 history=None, text_fetcher=None, scan_budget=1.0, quarantine_base=0.5, quarantine_max=30.0):
+        self.ui_queue = ui_queue
+        self.backend = backend or get_window_backend()
+        self.source = event_source or create_event_source()
+        self.polling = isinstance(self.source, PollingEventSource)
+        self.resync_interval = resync_interval
+        self.scheduler = scheduler or PollScheduler()
+        # 다운로드 폴더 인덱스는 첫 메시지 창을 찾아 다운로드를 요청할 때 만듦 (로그인 직후 디스크 부하 감소)
+        self._download_index = download_index
+        self._coordinator = coordinator
+        self.max_scans_per_wake = max_scans_per_wake
+        self.discovery_interval = discovery_interval
+        self.history = history
+        # 훅 모드에서는 이름 변경 이벤트로, 폴링 모드에서는 매 주기 세대를 올려 텍스트 캐시를 무효화
+        self.text_fetcher = text_fetcher or TextFetcher(self.backend)
+        self.scan_budget = scan_budget
+        self.quarantine_base = quarantine_base
+        self.quarantine_max = quarantine_max
+
+        self.windows = {}
+        self.rotation = []
+        self.active = None
+        self.active_rect = None
+        self.need_discovery = True
+        self.last_discovery = 0.0
+
+        metrics = get_metrics()
+        metrics.add_source("scheduler", self.scheduler.stats)
+        metrics.add_source("handle_cache", self.handle_cache_stats)
+        metrics.add_source("text_fetcher", self.text_fetcher.stats)
+        metrics.add_source("downloads", lambda: self._coordinator.stats() if self._coordinator else {})
+
+    def run(self):
+        log("파일 관리자 시작")
+        while not self.source.closed:
+            self.step()
+            self.wait()
+
+    def step(self):
+        """창 확인 -> 전경 창 결정 -> 스캔 한 차례"""
+        now = time.monotonic()
+        if self.polling:
+            self.text_fetcher.next_generation()
+        if self.polling and now - self.last_discovery >= self.discovery_interval:
+            self.need_discovery = True
+        if self.need_discovery:
+            self.discover(now)
+        elif self.polling:
+            self.validate()
+
+        moved = self.update_active()
+
+        if not self.windows:
+            self.scheduler.on_idle()
+            return
+        # 폴링 모드에서는 창 이동도 변화로 봐서 끌고 있는 동안 패널이 짧은 주기로 따라가게 함
+        changed = moved
+        for state in self.next_scan_batch():
+            changed = self.scan_window(state) or changed
+        if changed:
+            self.scheduler.on_change()
+        else:
+            self.scheduler.on_stable()
+
+    def discover(self, now=None):
+        """최상위 창을 한 번 훑어 감시 대상 목록을 갱신"""
+        self.need_discovery = False
+        self.last_discovery = now if now is not None else time.monotonic()
+        found = find_window_by_title_keyword(TARGET_WINDOW_TITLE, self.backend)
+        for hwnd in found:
+            if hwnd not in self.windows:
+                self.windows[hwnd] = MessageWindowState(hwnd, self.backend)
+                self.rotation.append(hwnd)
+                self.scheduler.on_change()
+        found = set(found)
+        for hwnd in [h for h in self.windows if h not in found]:
+            self.drop_window(hwnd)
+        self.track_processes()
+
+    def track_processes(self):
+        """감시 중인 창의 프로세스로 이벤트 훅 범위를 좁힘 (창이 없으면 모든 프로세스로 되돌림)"""
+        pids = set()
+        for hwnd, state in self.windows.items():
+            if state.pid is None:
+                state.pid = self.backend.get_window_process_id(hwnd)
+            if state.pid:
+                pids.add(state.pid)
+        if pids != self.source.processes:
+            self.source.track_processes(pids)
+
+    def validate(self):
+        """감시 중인 창이 아직 살아있고 제목이 맞는지 값싸게 확인"""
+        for hwnd, state in list(self.windows.items()):
+            if state.cache.get(CACHE_TARGET, title_keywords=TARGET_WINDOW_TITLE) is None:
+                self.drop_window(hwnd)
+
+    def drop_window(self, hwnd):
+        self.windows.pop(hwnd, None)
+        if hwnd in self.rotation:
+            self.rotation.remove(hwnd)
+        self.coordinator.forget(hwnd)
+
+    def update_active(self):
+        """패널이 따라갈 창 결정 (전경 메시지 창 > 기존 창 > 첫 번째 창)
+
+        폴링 모드에서 따라가는 창이 지난번 확인 이후 움직였으면 True
+        """
+        foreground = self.backend.get_foreground_window()
+        if foreground in self.windows:
+            active = foreground
+        elif self.active in self.windows:
+            active = self.active
+        else:
+            active = self.rotation[0] if self.rotation else None
+
+        if active == self.active:
+            if active is not None and self.polling:
+                self.ui_queue.publish(UI_POSITION_CHANGED, active)
+                return self.check_moved(active)
+            return False
+        self.active = active
+        self.active_rect = None
+        if active is None:
+            self.ui_queue.publish(UI_WINDOW_LOST)
+            return False
+        if self.polling:
+            self.check_moved(active)
+        self.ui_queue.publish(UI_WINDOW_FOUND, active)
+        state = self.windows[active]
+        if state.scans:
+            self.publish_files(state)
+        return True
+
+    def check_moved(self, hwnd):
+        """창 위치를 지난번과 비교 (이동 알림이 없는 폴링 모드용)"""
+        try:
+            rect = self.backend.get_window_rect(hwnd)
+        except OSError:
+            return False
+        moved = self.active_rect is not None and rect != self.active_rect
+        self.active_rect = rect
+        return moved
+
+    def next_scan_batch(self):
+        """이번에 스캔할 창 목록 (전경 창 우선, 나머지는 순환)"""
+        now = time.monotonic()
+        candidates = [h for h in self.rotation
+                      if (self.polling or self.windows[h].need_scan) and self.windows[h].quarantined_until <= now]
+        if self.active in candidates:
+            candidates.remove(self.active)
+            candidates.insert(0, self.active)
+        batch = candidates[:self.max_scans_per_wake]
+        for hwnd in batch:
+            # 스캔한 창은 순환 순서의 맨 뒤로
+            self.rotation.remove(hwnd)
+            self.rotation.append(hwnd)
+        return [self.windows[h] for h in batch]
+
+    def publish_files(self, state):
+        self.ui_queue.publish(UI_FILES_CHANGED, list(state.filenames))
+        self.ui_queue.publish(UI_STATUS, f"총 {len(set(state.texts))}개 파일 발견됨")
+
+    def scan_window(self, state):
+        """창 하나를 스캔하고 첨부파일 목록이 바뀌었으면 True"""
+        state.need_scan = False
+        started = time.monotonic()
+        try:
+            valid_texts, save_button = scan_message_window_cached(state.hwnd, state.cache, backend=self.backend,
+                                                                  fetcher=self.text_fetcher,
+                                                                  deadline=started + self.scan_budget)
+        except TimeoutError as e:
+            self.quarantine(state, e)
+            return False
+        state.last_scan_ms = (time.monotonic() - started) * 1000
+        if state.timeouts:
+            log(f"메시지 창 응답 회복 (HWND: {hex(state.hwnd)})")
+            state.timeouts = 0
+            state.quarantined_until = 0.0
+        state.scans += 1
+        state.known_controls = set(h for h, _ in valid_texts)
+        current_texts = [text for _, text in valid_texts]
+
+        added, removed = diff_attachments(state.texts, current_texts)
+        if not added and not removed and state.scans > 1:
+            return False
+        state.texts = current_texts
+        state.labels = [parse_attachment_label(text) for text in current_texts]
+        state.filenames = [label.filename for label in state.labels]
+        if self.history is not None and added:
+            title = self.backend.get_window_text(state.hwnd)
+            for text in added:
+                filename = extract_filename(text)
+                self.history.record(filename, extract_size_text(text), title,
+                                    os.path.join(get_download_path(), filename))
+        is_active = state.hwnd == self.active
+        if is_active:
+            self.publish_files(state)
+
+        coordinator = self.coordinator
+        if coordinator.completion is not None:
+            coordinator.completion.expect(state.labels)
+        requested = coordinator.request(state.hwnd, state.filenames, save_button)
+        if requested and is_active:
+            self.ui_queue.publish(
+                UI_STATUS, f"총 {len(set(state.texts))}개 파일 중 {len(requested)}개 다운로드 요청 중...")
+        return True
+
+    def quarantine(self, state, error):
+        """응답 없는 창은 점점 긴 간격으로만 다시 시도 (그동안 패널에는 마지막으로 알던 목록이 남음)"""
+        state.timeouts += 1
+        delay = min(self.quarantine_base * (2 ** (state.timeouts - 1)), self.quarantine_max)
+        state.quarantined_until = time.monotonic() + delay
+        state.need_scan = True
+        get_metrics().count("window_quarantined")
+        log(f"메시지 창 응답 없음 (HWND: {hex(state.hwnd)}, {state.timeouts}회째, {delay:.1f}초 후 재시도): {error}")
+        if state.hwnd == self.active:
+            self.ui_queue.publish(UI_STATUS, "메시지 창이 응답하지 않습니다 (마지막 목록 표시 중)")
+
+    def handle_cache_stats(self):
+        """모든 감시 중인 창의 HandleCache 합계"""
+        hits = misses = entries = 0
+        for state in list(self.windows.values()):
+            stats = state.cache.stats()
+            hits += stats["hits"]
+            misses += stats["misses"]
+            entries += stats["entries"]
+        total = hits + misses
+        return {"windows": len(self.windows), "hits": hits, "misses": misses,
+                "hit_rate": hits / total if total else 0.0, "entries": entries}
+
+    def health(self):
+        """창별 응답 상태 (IPC state 명령에서 사용)"""
+        now = time.monotonic()
+        return {
+            hex(hwnd): {
+                "timeouts": state.timeouts,
+                "quarantined_for": round(max(0.0, state.quarantined_until - now), 2),
+                "last_scan_ms": round(state.last_scan_ms, 2),
+            }
+            for hwnd, state in list(self.windows.items())
+        }
+
+    def owner_of(self, hwnd):
+        """hwnd가 속한 감시 중인 창의 상태, 없으면 None"""
+        for state in self.windows.values():
+            if hwnd in state.known_controls:
+                return state
+        for state in self.windows.values():
+            if self.backend.is_child(state.hwnd, hwnd):
+                return state
+        return None
+
+    @property
+    def coordinator(self):
+        if self._coordinator is None:
+            if self._download_index is None:
+                index, completion = get_download_index(), get_completion_tracker()
+            else:
+                index, completion = self._download_index, DownloadCompletionTracker(self._download_index)
+            self._coordinator = DownloadCoordinator(index, self.backend, completion=completion)
+        return self._coordinator
+
+    def wait(self):
+        if self._coordinator is not None:
+            done, failed = self._coordinator.poll()
+            if failed:
+                self.ui_queue.publish(UI_STATUS, f"{len(failed)}개 파일 다운로드 실패")
+            elif done and not self._coordinator.in_flight(self.active):
+                self.ui_queue.publish(UI_STATUS, "다운로드 완료")
+
+        self.scheduler.wake()
+        timeout = self.scheduler.interval if self.polling else self.resync_interval
+        now = time.monotonic()
+        quarantined = [s.quarantined_until for s in self.windows.values() if s.need_scan and s.quarantined_until > now]
+        if quarantined:
+            # 격리가 풀리는 시점에 다시 시도하도록 깨어날 시간을 앞당김
+            timeout = min(timeout, min(quarantined) - now)
+        events = self.source.wait(timeout)
+        if not events and not self.polling:
+            self.need_discovery = True
+            self.text_fetcher.next_generation()
+            for state in self.windows.values():
+                state.need_scan = True
+        for event in events:
+            self.handle_event(event)
+
+    def request_rescan(self):
+        """모든 창을 다시 찾고 다시 스캔 (다른 스레드에서 호출 가능)"""
+        self.need_discovery = True
+        self.text_fetcher.next_generation()
+        for state in list(self.windows.values()):
+            state.need_scan = True
+        self.source.post(EVENT_POLL)
+
+    def handle_event(self, event):
+        if event.kind in (EVENT_NAME_CHANGED, EVENT_DESTROYED) and event.hwnd is not None:
+            self.text_fetcher.invalidate(event.hwnd)
+        if event.kind in (EVENT_POLL, EVENT_FOREGROUND):
+            # 전경 창은 step()에서 매번 확인함
+            return
+        if event.kind == EVENT_LOCATION_CHANGED:
+            if event.hwnd is not None and event.hwnd == self.active:
+                self.ui_queue.publish(UI_POSITION_CHANGED, self.active)
+            return
+        if event.hwnd in self.windows:
+            # 감시 중인 창 자체가 닫히거나 제목이 바뀜
+            self.need_discovery = True
+            self.windows[event.hwnd].need_scan = True
+            return
+        if event.kind == EVENT_DESTROYED:
+            for state in self.windows.values():
+                if event.hwnd in state.known_controls:
+                    state.need_scan = True
+            return
+        state = self.owner_of(event.hwnd)
+        if state is not None:
+            state.need_scan = True
+        elif get_title_matcher(TARGET_WINDOW_TITLE).rank(self.backend.get_window_text(event.hwnd)) is not None:
+            self.need_discovery = True
+
+
+def adaptive_watcher(ui_queue, **kwargs):
+    """메시지 창 감시 루프 (MessageWatcher 참고)"""
+    MessageWatcher(ui_queue, **kwargs).run()
+
+
+def get_daemon_info_path():
+    return os.path.join(get_app_data_dir(), "daemon.json")
+
+
+class WatcherIpcServer:
+    """헤드리스 모드의 로컬 IPC 서버 (127.0.0.1 TCP, JSON 한 줄이 메시지 하나)
+
+    감시 스레드가 UiUpdateQueue에 보낸 이벤트를 접속한 모든 클라이언트에 그대로 전달하고,
+    현재 창/첨부파일/상태를 기억해두었다가 새로 접속한 클라이언트에 먼저 보내줌
+    다른 사용자/프로세스가 첨부파일 기록을 검색하지 못하도록, 시작할 때 만든 임의 토큰을 사용자별 폴더의
+    daemon.json에만 적어두고 첫 메시지로 hello(token)를 보내지 않은 연결은 auth_timeout초 안에 끊음
+    클라이언트 명령: hello(token), state, ping(ts), rescan, search(query)
+    서버 메시지: state, event(kind, payload, seq, ts, queue_ms), pong(ts, server_ts), result, error
+    ts는 서버가 보낸 시각(time.time())이고 queue_ms는 감시 스레드가 보낸 뒤 서버가 꺼내기까지 걸린 시간
+    """
+
+    def __init__(self, ui_queue, watcher=None, host="127.0.0.1", port=0, info_path=None, auth_timeout=5.0):
+        self.ui_queue = ui_queue
+        self.watcher = watcher
+        self.host = host
+        self.port = port
+        self.info_path = info_path or get_daemon_info_path()
+        self.auth_timeout = auth_timeout
+        self.token = None
+        self.rejected = 0
+        self.state = {"window": None, "files": [], "status": "", "updated": []}
+        self.seq = 0
+        self.clients = []
+        self._lock = threading.Lock()
+        # 연결별 전송 잠금: _pump의 방송과 클라이언트 스레드의 응답이 한 연결에 동시에 sendall하면
+        # 두 메시지의 바이트가 섞일 수 있으므로 한 번에 한 메시지만 보냄
+        self._send_locks = {}
+        self._sock = None
+        self.closed = False
+
+    def start(self):
+        import secrets
+        import socket
+
+        self.token = secrets.token_hex(16)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen(8)
+        self.port = self._sock.getsockname()[1]
+        # %APPDATA%는 사용자별 폴더, 그 밖의 환경에서는 파일 권한으로 본인만 읽도록 함
+        fd = os.open(self.info_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump({"port": self.port, "pid": os.getpid(), "token": self.token}, f)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._pump, daemon=True).start()
+        log(f"IPC 서버 시작 (127.0.0.1:{self.port})")
+        return self.port
+
+    def stop(self):
+        self.closed = True
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        with self._lock:
+            clients, self.clients = self.clients, []
+            self._send_locks.clear()
+        for conn in clients:
+            conn.close()
+
+    def snapshot(self):
+        snap = dict(self.state, type="state")
+        snap["ui_queue"] = self.ui_queue.stats()
+        if self.watcher is not None:
+            snap["windows"] = self.watcher.health()
+            if self.watcher._coordinator is not None:
+                snap["downloads"] = self.watcher._coordinator.stats()
+        return snap
+
+    def _accept_loop(self):
+        while not self.closed:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            conn.settimeout(min(2.0, self.auth_timeout))
+            with self._lock:
+                self._send_locks[conn] = threading.Lock()
+            threading.Thread(target=self._client_loop, args=(conn,), daemon=True).start()
+
+    def _authenticate(self, line):
+        import hmac
+
+        try:
+            message = json.loads(line)
+            token = message.get("token") if message.get("cmd") == "hello" else None
+        except (ValueError, AttributeError):
+            return False
+        return isinstance(token, str) and hmac.compare_digest(token, self.token)
+
+    def _client_loop(self, conn):
+        """첫 줄로 인증한 뒤에만 상태를 보내고 이벤트 구독자로 등록"""
+        import socket
+
+        buffer = b""
+        authenticated = False
+        auth_deadline = time.monotonic() + self.auth_timeout
+        while not self.closed:
+            if not authenticated and time.monotonic() > auth_deadline:
+                self.rejected += 1
+                break
+            try:
+                chunk = conn.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not chunk:
+                break
+            buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                if not line.strip():
+                    continue
+                if authenticated:
+                    self._send(conn, self.handle_command(line))
+                elif self._authenticate(line):
+                    authenticated = True
+                    self._send(conn, self.snapshot())
+                    with self._lock:
+                        self.clients.append(conn)
+                else:
+                    self.rejected += 1
+                    log("IPC 인증 실패: 연결을 끊음")
+                    self._send(conn, {"type": "error", "error": "unauthorized"})
+                    self._drop(conn)
+                    return
+        self._drop(conn)
+
+    def handle_command(self, line):
+        try:
+            message = json.loads(line)
+            cmd = message.get("cmd")
+        except (ValueError, AttributeError):
+            return {"type": "error", "error": "invalid json"}
+        if cmd == "state":
+            return self.snapshot()
+        if cmd == "ping":
+            return {"type": "pong", "ts": message.get("ts"), "server_ts": time.time()}
+        if cmd == "rescan":
+            if self.watcher is None:
+                return {"type": "error", "error": "no watcher"}
+            self.watcher.request_rescan()
+            return {"type": "result", "cmd": cmd, "ok": True}
+        if cmd == "search":
+            rows = get_attachment_history().search(message.get("query", ""))
+            return {"type": "result", "cmd": cmd, "rows": [list(row) for row in rows]}
+        return {"type": "error", "error": f"unknown cmd: {cmd}"}
 
-        if abs(diff_x) < 2 and abs(diff_y) < 2:
-            self.window.geometry(f"380x500+{target_x}+{target_y}")
-            self.animation_id = None
-            return
+    def _pump(self):
+        """UiUpdateQueue를 비우며 상태를 갱신하고 모든 클라이언트에 전달"""
+        while not self.closed:
+            self.ui_queue.wait(1.0)
+            events = self.ui_queue.drain()
+            if not events:
+                continue
+            queue_ms = round(self.ui_queue.last_latency * 1000, 3)
+            for kind, payload in events:
+                self._apply(kind, payload)
+                self.seq += 1
+                self.broadcast({"type": "event", "kind": kind, "payload": payload, "seq": self.seq,
+                                "ts": time.time(), "queue_ms": queue_ms})
 
-        new_x = current_x + diff_x // 5
-        new_y = current_y + diff_y // 5
+    def _apply(self, kind, payload):
+        if kind == UI_WINDOW_FOUND:
+            self.state["window"] = payload
+        elif kind == UI_WINDOW_LOST:
+            self.state["window"] = None
+            self.state["files"] = []
+        elif kind == UI_FILES_CHANGED:
+            self.state["files"] = list(payload)
+        elif kind == UI_STATUS:
+            self.state["status"] = payload
+        elif kind == UI_FILES_UPDATED:
+            self.state["updated"] = sorted(payload)[-50:]
 
-        self.window.geometry(f"380x500+{new_x}+{new_y}")
+    def broadcast(self, message):
+        with self._lock:
+            clients = list(self.clients)
+        for conn in clients:
+            if not self._send(conn, message):
+                self._drop(conn)
 
-        self.animation_id = self.window.after(16, self.animate_window_position) 
+    def _send(self, conn, message):
+        data = (json.dumps(message, ensure_ascii=False, default=list) + "\n").encode("utf-8")
+        with self._lock:
+            lock = self._send_locks.get(conn)
+        if lock is None:
+            # 이미 끊은 연결
+            return False
+        try:
+            with lock:
+                conn.sendall(data)
+            return True
+        except OSError:
+            return False
+
+    def _drop(self, conn):
+        with self._lock:
+            if conn in self.clients:
+                self.clients.remove(conn)
+            self._send_locks.pop(conn, None)
+        try:
+            conn.close()
+        except OSError:
+            pass
 
-def adaptive_watcher(gui):
-    last_seen_texts = set()
-    log("파일 관리자 시작")
-    last_window_check_time = 0
-    window_check_interval = 100
 
+class WatcherIpcClient:
+    """WatcherIpcServer 접속 클라이언트 (port/token을 주지 않으면 daemon.json에서 읽음)
+
+    접속하면 바로 hello(token)로 인증하고, 서버는 그 응답으로 현재 상태를 보내줌
+    """
+
+    def __init__(self, port=None, host="127.0.0.1", timeout=5.0, token=None, info_path=None):
+        import socket
+
+        if port is None or token is None:
+            with open(info_path or get_daemon_info_path(), "r", encoding="utf-8") as f:
+                info = json.load(f)
+            port = info["port"] if port is None else port
+            token = info.get("token", "") if token is None else token
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self._buffer = b""
+        self.send("hello", token=token)
+
+    def send(self, cmd, **fields):
+        fields["cmd"] = cmd
+        self.sock.sendall((json.dumps(fields, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def receive(self):
+        """다음 메시지 (연결이 끊기면 None, 시간 초과는 socket.timeout)"""
+        while b"\n" not in self._buffer:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def request(self, cmd, **fields):
+        """명령을 보내고 응답을 기다림 (그 사이에 온 이벤트는 건너뜀)"""
+        self.send(cmd, **fields)
+        while True:
+            message = self.receive()
+            if message is None or message["type"] != "event":
+                return message
+
+    def close(self):
+        self.sock.close()
+
+
+def forward_ipc_events(ui_queue, port=None):
+    """헤드리스 감시 프로세스에 접속해 받은 이벤트를 패널의 UiUpdateQueue로 전달 (--attach)"""
     while True:
-        current_time = int(time.time() * 1000)
+        try:
+            client = WatcherIpcClient(port, timeout=None)
+        except (OSError, ValueError) as e:
+            ui_queue.publish(UI_STATUS, f"감시 프로세스 연결 대기 중: {e}")
+            time.sleep(2.0)
+            continue
+        while True:
+            message = client.receive()
+            if message is None:
+                break
+            if message["type"] == "event":
+                ui_queue.publish(message["kind"], message["payload"])
+            elif message["type"] == "state" and message["window"] is not None:
+                ui_queue.publish(UI_WINDOW_FOUND, message["window"])
+                ui_queue.publish(UI_FILES_CHANGED, message["files"])
+                ui_queue.publish(UI_STATUS, message["status"])
+        client.close()
+        ui_queue.publish(UI_WINDOW_LOST)
 
-        if current_time - last_window_check_time > window_check_interval:
-            last_window_check_time = current_time
 
-            top_windows = find_window_by_title_keyword(TARGET_WINDOW_TITLE)
-            if not top_windows:
-                gui.window.withdraw()
-                gui.clear_files()
-                last_seen_texts.clear()
-                time.sleep(0.5)
-                continue
-            hwnd = top_windows[0]
-            gui.attach_to_window(hwnd)
-            gui.window.deiconify()
+def measure_ipc_latency(port=None, pings=200, listen_seconds=0.0):
+    """--ipc-latency: 왕복(ping) 시간과 이벤트 전달 지연을 측정해 Histogram 요약으로 반환
 
-        valid_texts = find_controls_by_size_pattern(hwnd)
-        current_texts = set(text for _, text in valid_texts)
+    이벤트 지연 = 서버 큐 대기(queue_ms) + 서버 전송 시각부터 수신까지
+    """
+    client = WatcherIpcClient(port)
+    client.receive()  # 접속 직후 상태
+    rtt = Histogram()
+    for _ in range(pings):
+        started = time.perf_counter()
+        client.request("ping", ts=time.time())
+        rtt.add((time.perf_counter() - started) * 1000)
 
-        if current_texts != last_seen_texts:
-            gui.clear_files()
-            for text in current_texts:
-                filename = extract_filename(text)
-                gui.add_file(filename)
+    delivery = Histogram()
+    if listen_seconds:
+        client.sock.settimeout(0.5)
+        deadline = time.time() + listen_seconds
+        while time.time() < deadline:
+            try:
+                message = client.receive()
+            except OSError:
+                continue
+            if message is None:
+                break
+            if message["type"] == "event":
+                delivery.add(message["queue_ms"] + (time.time() - message["ts"]) * 1000)
+    client.close()
+    return {"ping_rtt_ms": rtt.summary(), "event_delivery_ms": delivery.summary()}
 
-                filepath = os.path.join(DOWNLOAD_PATH, filename)
-                if not os.path.exists(filepath):
-                    if click_button_by_text(hwnd, SAVE_BUTTON_TEXT):
-                        gui.update_status(f"'{filename}' 다운로드 요청 중...")
-            
-            file_count = len(current_texts)
-            gui.update_status(f"총 {file_count}개 파일 발견됨")
-            last_seen_texts = current_texts
 
-        time.sleep(0.05)
+def run_headless(port=0):
+    """Tk 없이 감시/자동 다운로드만 실행하고 상태는 로컬 IPC로 제공 (--headless)"""
+    ui_queue = UiUpdateQueue()
+    watcher = MessageWatcher(ui_queue, history=get_attachment_history())
+    server = WatcherIpcServer(ui_queue, watcher=watcher, port=port)
+    server.start()
+    try:
+        watcher.run()
+    finally:
+        server.stop()
 
-def main():
+
+def main(attach=False):
     gui = FileManagerGUI()
 
-    watcher_thread = threading.Thread(target=adaptive_watcher, args=(gui,), daemon=True)
-    watcher_thread.start()
+    if attach:
+        # 감시는 헤드리스 프로세스가 하고 패널은 IPC 구독자로만 동작
+        threading.Thread(target=forward_ipc_events, args=(gui.ui_queue,), daemon=True).start()
+    else:
+        watcher_thread = threading.Thread(target=adaptive_watcher, args=(gui.ui_queue,),
+                                          kwargs={"history": get_attachment_history()}, daemon=True)
+        watcher_thread.start()
     
     # 자동 업데이트 스레드 (5분 주기)
     update_thread = threading.Thread(target=check_and_update_loop, daemon=True)
@@ -797,17 +4164,25 @@ def main():
     gui.window.mainloop()
 
 def check_and_update_loop(interval_minutes=5):
-    """주기적으로 업데이트 확인 (백그라운드)"""
+    """주기적으로 업데이트 확인 (백그라운드, 지터와 백오프 적용)"""
+    schedule = UpdateCheckSchedule(interval_minutes * 60)
+    time.sleep(schedule.initial_delay())
     while True:
         try:
             check_and_update()
+            delay = schedule.on_success()
+        except ReleaseRateLimited as e:
+            delay = schedule.on_rate_limited(e.retry_after)
         except Exception as e:
             print(f"[update thread] update check failed: {e}")
-        time.sleep(interval_minutes * 60)
+            delay = schedule.on_error()
+        time.sleep(delay)
 
 
 class UpdateDialog:
     def __init__(self, parent):
+        from tkinter import ttk
+
         self.parent = parent
         self.cancelled = False
         
@@ -850,11 +4225,19 @@ class UpdateDialog:
         # 닫기 버튼 비활성화 및 프로토콜 설정
         self.dialog.protocol("WM_DELETE_WINDOW", self.on_cancel)
     
+    def post(self, method, *args):
+        """작업 스레드에서 다이얼로그 메서드를 Tk 스레드로 넘겨 호출 (위젯은 Tk 스레드에서만 건드림)"""
+        self.parent.after(0, self._call, method, args)
+
+    def _call(self, method, args):
+        # 취소 후 닫힌 다이얼로그에 늦게 도착한 호출은 버림
+        if self.dialog.winfo_exists():
+            method(*args)
+
     def set_status(self, text):
         """상태 메시지 업데이트"""
         if not self.cancelled:
             self.status_label.config(text=text)
-            self.dialog.update()
     
     def set_progress(self, value=None, maximum=None):
         """진행 상태 업데이트"""
@@ -865,7 +4248,6 @@ class UpdateDialog:
             
             self.progress["maximum"] = maximum
             self.progress["value"] = value
-        self.dialog.update()
     
     def set_version_info(self, current, latest):
         """버전 정보 표시"""
@@ -874,8 +4256,6 @@ class UpdateDialog:
         
         self.current_version_label.pack(anchor=tk.W, pady=2)
         self.latest_version_label.pack(anchor=tk.W, pady=2)
-        
-        self.dialog.update()
     
     def complete(self, success, message):
         """업데이트 프로세스 완료"""
@@ -887,8 +4267,6 @@ class UpdateDialog:
         
         # 버튼 변경
         self.cancel_button.config(text="확인", command=self.close)
-        
-        self.dialog.update()
     
     def close(self):
         """다이얼로그 닫기"""
@@ -904,34 +4282,367 @@ class UpdateDialog:
         self.dialog.after(500, self.close)
 
 
-def download_with_progress(url, path, dialog):
-    """진행률 표시와 함께 파일 다운로드"""
-    try:
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        # 파일 크기 확인
-        total_size = int(response.headers.get('content-length', 0))
-        dialog.set_progress(0, total_size)
-        
-        # 청크 단위로 다운로드하면서 진행률 업데이트
-        downloaded = 0
-        with open(path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if dialog.cancelled:
+class UpdateDownloadError(Exception):
+    """받은 업데이트 파일이 릴리스 정보(크기/해시)와 맞지 않음"""
+
+
+class UpdateDownloader:
+    """이어받기와 검증을 지원하는 업데이트 파일 다운로드 엔진
+
+    path + ".part"에 받다가 끊기면 다음 시도에서 HTTP Range로 이어받고,
+    다 받으면 expected_size / expected_digest("sha256:..." 또는 16진 문자열)로 검증한 뒤 path로 옮김
+    읽기 단위는 한 번 읽는 데 target_chunk_time 정도 걸리도록 min_chunk~max_chunk 사이에서 조절하고,
+    progress(받은 바이트, 전체 바이트) 콜백은 progress_interval초에 한 번 이하로만 호출함
+    """
+
+    def __init__(self, url, path, expected_size=None, expected_digest=None, progress=None, cancelled=None,
+                 min_chunk=64 * 1024, max_chunk=4 * 1024 * 1024, target_chunk_time=0.25,
+                 progress_interval=0.2, retries=5, timeout=30):
+        self.url = url
+        self.path = path
+        self.part_path = path + ".part"
+        self.expected_size = expected_size
+        self.expected_digest = expected_digest
+        self.progress = progress
+        self.cancelled = cancelled or (lambda: False)
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.target_chunk_time = target_chunk_time
+        self.progress_interval = progress_interval
+        self.retries = retries
+        self.timeout = timeout
+
+        self.total = expected_size
+        self.chunk_size = min_chunk
+        self.attempts = 0
+        self.resumed_from = 0
+        self.verify_failures = 0
+        self.progress_reports = 0
+        self._last_report = 0.0
+
+    def run(self):
+        """다운로드 후 검증까지 마치면 True (취소/실패 시 .part는 남겨 다음에 이어받음)"""
+        import requests
+
+        for attempt in range(1, self.retries + 1):
+            self.attempts = attempt
+            if self.cancelled():
+                return False
+            try:
+                if not self._download():
                     return False
-                    
-                if chunk:
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    dialog.set_progress(downloaded, total_size)
-        
+                self._verify()
+                os.replace(self.part_path, self.path)
+                return True
+            except UpdateDownloadError as e:
+                # 검증 실패: 받은 내용을 믿을 수 없으므로 처음부터 한 번만 다시 받아봄
+                print(f"업데이트 파일 검증 실패 ({attempt}/{self.retries}): {e}")
+                self._discard()
+                self.verify_failures += 1
+                if self.verify_failures >= 2:
+                    return False
+            except (requests.RequestException, OSError) as e:
+                print(f"다운로드 오류 ({attempt}/{self.retries}): {e}")
+                time.sleep(min(2 ** attempt, 30))
+        return False
+
+    def _discard(self):
+        try:
+            os.remove(self.part_path)
+        except OSError:
+            pass
+
+    def _download(self):
+        import requests
+
+        offset = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        if self.expected_size is not None:
+            if offset > self.expected_size:
+                self._discard()
+                offset = 0
+            elif offset and offset == self.expected_size:
+                return True
+
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with requests.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if offset and response.status_code == 416:
+                # 이미 끝까지 받아둔 상태
+                return True
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                self.resumed_from = offset
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rsplit("/", 1)[-1]
+                total = int(total) if total.isdigit() else None
+            else:
+                # 서버가 Range를 무시함 - 처음부터
+                offset = 0
+                length = response.headers.get("Content-Length")
+                total = int(length) if length and length.isdigit() else None
+
+            if self.expected_size is not None and total is not None and total != self.expected_size:
+                raise UpdateDownloadError(f"서버 파일 크기 {total} != 릴리스 정보 {self.expected_size}")
+            self.total = self.expected_size or total
+
+            done = offset
+            self._report(done, force=True)
+            with open(self.part_path, "ab" if offset else "wb") as f:
+                while True:
+                    if self.cancelled():
+                        return False
+                    start = time.perf_counter()
+                    try:
+                        data = response.raw.read(self.chunk_size, decode_content=True)
+                    except Exception as e:
+                        # urllib3 예외(연결 끊김 등)를 재시도 대상으로 변환
+                        raise requests.ConnectionError(e) from e
+                    if not data:
+                        break
+                    f.write(data)
+                    done += len(data)
+                    self._adapt_chunk(time.perf_counter() - start)
+                    self._report(done)
+            self._report(done, force=True)
         return True
+
+    def _adapt_chunk(self, elapsed):
+        """한 번 읽는 시간이 target_chunk_time 근처가 되도록 읽기 단위 조절"""
+        if elapsed < self.target_chunk_time / 2:
+            self.chunk_size = min(self.chunk_size * 2, self.max_chunk)
+        elif elapsed > self.target_chunk_time * 2:
+            self.chunk_size = max(self.chunk_size // 2, self.min_chunk)
+
+    def _report(self, done, force=False):
+        if self.progress is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_report < self.progress_interval:
+            return
+        self._last_report = now
+        self.progress_reports += 1
+        self.progress(done, self.total or 0)
+
+    def _verify(self):
+        size = os.path.getsize(self.part_path)
+        if self.expected_size is not None and size != self.expected_size:
+            raise UpdateDownloadError(f"파일 크기 {size} != 릴리스 정보 {self.expected_size}")
+        if not self.expected_digest:
+            return
+        algorithm, _, expected = self.expected_digest.rpartition(":")
+        h = hashlib.new(algorithm or "sha256")
+        with open(self.part_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        if h.hexdigest().lower() != expected.lower():
+            raise UpdateDownloadError(f"{algorithm or 'sha256'} 해시 불일치")
+
+
+def download_with_progress(url, path, dialog, expected_size=None, expected_digest=None):
+    """진행률 표시와 함께 업데이트 파일 다운로드 (진행률은 Tk 스레드에서 반영)"""
+    def progress(done, total):
+        dialog.post(dialog.set_progress, done, total)
+
+    downloader = UpdateDownloader(url, path, expected_size, expected_digest,
+                                  progress=progress, cancelled=lambda: dialog.cancelled)
+    try:
+        return downloader.run()
     except Exception as e:
         print(f"다운로드 오류: {e}")
         return False
 
 
+UpdateStep = namedtuple("UpdateStep", ["action", "args"])
+
+
+def build_update_plan(exe_path, staged_path, version=None, pids=(), version_file_exists=False):
+    """업데이트 적용 단계 목록 (파일 시스템을 건드리지 않는 순수 함수)
+
+    실행 중인 exe도 이름 변경은 가능하므로 exe -> .old, 새 파일 -> exe 순서로 rename 교체함
+    exe는 시작프로그램 폴더에 둘 수 있으므로 .old는 받은 파일과 같은 폴더(앱 데이터 폴더)에 두고
+    exe 폴더에는 마지막 rename만 함. 받은 폴더가 exe와 다른 드라이브일 때만 rename이 가능하도록
+    exe 옆으로 먼저 복사함
+    새 exe는 --finish-update로 실행되어 이전 프로세스(pids)가 끝나기를 기다린 뒤 .old를 지움
+    """
+    exe_dir = os.path.dirname(exe_path)
+    exe_name = os.path.basename(exe_path)
+    stage_dir = os.path.dirname(staged_path)
+    same_volume = (os.path.normcase(os.path.splitdrive(stage_dir)[0]) ==
+                   os.path.normcase(os.path.splitdrive(exe_dir)[0]))
+    old_path = os.path.join(stage_dir if same_volume else exe_dir, f".{exe_name}.old")
+    steps = []
+
+    if not same_volume:
+        new_path = os.path.join(exe_dir, f".{exe_name}.new")
+        steps.append(UpdateStep("copy", (staged_path, new_path)))
+        steps.append(UpdateStep("remove", (staged_path,)))
+        staged_path = new_path
+
+    steps.append(UpdateStep("remove", (old_path,)))
+    steps.append(UpdateStep("rename", (exe_path, old_path)))
+    steps.append(UpdateStep("rename", (staged_path, exe_path)))
+    if version and version_file_exists:
+        steps.append(UpdateStep("write_text", (os.path.join(exe_dir, "version.txt"), version)))
+    steps.append(UpdateStep("launch", ([exe_path, "--finish-update", old_path] + [str(pid) for pid in pids],)))
+    return steps
+
+
+def build_cleanup_plan(old_path, pids, leftovers=()):
+    """새 exe가 시작할 때 실행할 정리 단계 (이전 프로세스 종료 대기 후 .old와 남은 임시 파일 삭제)"""
+    steps = [UpdateStep("wait_exit", (int(pid),)) for pid in pids]
+    steps.append(UpdateStep("remove", (old_path,)))
+    steps.extend(UpdateStep("remove", (path,)) for path in leftovers)
+    return steps
+
+
+def find_update_leftovers(exe_path):
+    """이전 버전이 exe 폴더에 남긴 업데이트 임시 파일 (.old/.new/.update_*.part)
+
+    시작프로그램 폴더에 남으면 로그인할 때마다 탐색기가 열려고 하므로 정리 대상
+    """
+    exe_dir = os.path.dirname(exe_path)
+    exe_name = os.path.basename(exe_path)
+    try:
+        names = os.listdir(exe_dir)
+    except OSError:
+        return []
+    return [os.path.join(exe_dir, name) for name in names
+            if name in (f".{exe_name}.old", f".{exe_name}.new") or
+            (name.startswith(".update_") and (name.endswith(f"_{exe_name}") or
+                                              name.endswith(f"_{exe_name}.part")))]
+
+
+def wait_for_process_exit(pid, timeout=30):
+    """프로세스가 끝날 때까지 대기 (고정 sleep 대신 프로세스 핸들을 기다림)"""
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        SYNCHRONIZE = 0x00100000
+        handle = kernel32.OpenProcess(SYNCHRONIZE, False, pid)
+        if not handle:
+            # 이미 종료된 프로세스
+            return True
+        try:
+            return kernel32.WaitForSingleObject(handle, int(timeout * 1000)) == 0
+        finally:
+            kernel32.CloseHandle(handle)
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _remove_file(path, attempts=20):
+    """파일 삭제 (없으면 무시, 백신 검사 등으로 잠겨 있으면 잠시 재시도)"""
+    for attempt in range(attempts):
+        try:
+            os.remove(path)
+            return
+        except FileNotFoundError:
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.1)
+
+
+def build_launch_env(environ=None):
+    """새 exe 실행용 환경 변수
+
+    onefile exe 안에서 띄운 프로세스는 부트로더 변수(_MEIPASS2, _PYI_*)를 물려받아 자기 압축을 풀지 않고
+    이전 프로세스의 _MEI 폴더를 쓰는데, 그 폴더는 이전 부트로더가 끝날 때 지워짐
+    (lazy import라 시작은 되고 나중에 ImportError가 남). 변수를 지우고 PyInstaller에 초기화를 요청함
+    """
+    env = dict(os.environ if environ is None else environ)
+    for name in list(env):
+        if name == "_MEIPASS2" or name.startswith("_PYI_"):
+            del env[name]
+    env["PYINSTALLER_RESET_ENVIRONMENT"] = "1"
+    return env
+
+
+def run_update_plan(steps, timings=None):
+    """업데이트 단계 실행 (단계별 소요 시간을 timings에 누적)
+
+    실패하면 이미 한 rename을 역순으로 되돌려 원래 exe로 복구하고 예외를 다시 발생시킴
+    """
+    timings = {} if timings is None else timings
+    renamed = []
+    try:
+        for step in steps:
+            started = time.perf_counter()
+            if step.action == "copy":
+                import shutil
+
+                shutil.copyfile(*step.args)
+            elif step.action == "remove":
+                _remove_file(step.args[0])
+            elif step.action == "rename":
+                os.replace(*step.args)
+                renamed.append(step.args)
+            elif step.action == "write_text":
+                path, text = step.args
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(text)
+            elif step.action == "launch":
+                import subprocess
+
+                subprocess.Popen(step.args[0], close_fds=True, env=build_launch_env())
+            elif step.action == "wait_exit":
+                if not wait_for_process_exit(step.args[0]):
+                    raise TimeoutError(f"PID {step.args[0]} did not exit")
+            else:
+                raise ValueError(f"unknown update step: {step.action}")
+            timings[step.action] = timings.get(step.action, 0) + time.perf_counter() - started
+    except Exception:
+        for src, dst in reversed(renamed):
+            try:
+                os.replace(dst, src)
+            except OSError as e:
+                print(f"업데이트 복구 실패: {dst} -> {src}: {e}")
+        raise
+    return timings
+
+
+def record_update_timing(phases, version=None):
+    """업데이트 단계별 소요 시간을 update_timing.json에 기록 (새 exe의 정리 시간도 합쳐 기록)"""
+    path = os.path.join(get_app_data_dir(), "update_timing.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        record = {}
+    if version:
+        record = {"version": version, "started_at": time.time(), "phases": {}}
+    record.setdefault("phases", {}).update({k: round(v, 4) for k, v in phases.items()})
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+    except OSError as e:
+        print(f"업데이트 시간 기록 실패: {e}")
+    print(f"⏱️ Update phases: {record['phases']}")
+
+
+def finish_update(args):
+    """--finish-update <old_path> <pid>...: 이전 프로세스 종료를 기다렸다가 남은 .old 파일 삭제"""
+    if not args:
+        return
+    old_path, pids = args[0], args[1:]
+    leftovers = find_update_leftovers(sys.executable) if getattr(sys, "frozen", False) else []
+    try:
+        timings = run_update_plan(build_cleanup_plan(old_path, pids, leftovers))
+        record_update_timing({"wait_exit": timings.get("wait_exit", 0),
+                              "cleanup": timings.get("remove", 0)})
+    except Exception as e:
+        print(f"업데이트 정리 실패: {e}")
+
+
 def get_resource_path(relative_path):
     """Get the absolute path to a resource, works for dev and for PyInstaller"""
     try:
@@ -960,14 +4671,326 @@ def get_local_version():
         return None
 
 
-def get_latest_release_info():
-    """GitHub API에서 최신 릴리스 정보 가져오기"""
-    url = f"https://api.github.com/repos/{REPO}/releases/latest"
-    headers = {"Accept": "application/vnd.github.v3+json"}
-    
-    r = requests.get(url, headers=headers, timeout=10)
-    r.raise_for_status()
-    return r.json()
+_VERSION_RE = re.compile(
+    r"^\s*v?(?P<nums>\d+(?:\.\d+)*)"
+    r"(?:-(?P<pre>[0-9A-Za-z.-]+))?"
+    r"(?:\+[0-9A-Za-z.-]+)?\s*$",
+    re.IGNORECASE,
+)
+
+
+class Version(namedtuple("Version", ["numbers", "prerelease"])):
+    """릴리스 버전 (v1.2.3, 1.2.3-beta.1, 1.2 형식)
+
+    숫자는 자리별로 정수 비교하고 빠진 자리는 0으로 봄 (1.2 == 1.2.0)
+    pre-release가 붙은 버전은 같은 번호의 정식 버전보다 낮음 (1.2.3-beta < 1.2.3)
+    """
+
+    @classmethod
+    def parse(cls, text):
+        """버전 문자열 해석 (형식이 맞지 않으면 None)"""
+        m = _VERSION_RE.match(text or "")
+        if not m:
+            return None
+        numbers = tuple(int(n) for n in m.group("nums").split("."))
+        while len(numbers) > 1 and numbers[-1] == 0:
+            numbers = numbers[:-1]
+        pre = m.group("pre")
+        return cls(numbers, tuple(pre.lower().split(".")) if pre else ())
+
+    @property
+    def is_prerelease(self):
+        return bool(self.prerelease)
+
+    def _key(self):
+        # 정식 버전은 (1,)로 pre-release (0, ...)보다 뒤에 오도록 함
+        # pre-release 식별자: 숫자는 숫자끼리 비교하고 문자보다 낮음 (semver 규칙)
+        if not self.prerelease:
+            return (self.numbers, (1,))
+        pre = tuple((0, int(p), "") if p.isdigit() else (1, 0, p) for p in self.prerelease)
+        return (self.numbers, (0, pre))
+
+    def __eq__(self, other):
+        return isinstance(other, Version) and self._key() == other._key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __lt__(self, other):
+        return self._key() < other._key()
+
+    def __le__(self, other):
+        return self._key() <= other._key()
+
+    def __gt__(self, other):
+        return self._key() > other._key()
+
+    def __ge__(self, other):
+        return self._key() >= other._key()
+
+    def __str__(self):
+        text = ".".join(str(n) for n in self.numbers)
+        if self.prerelease:
+            text += "-" + ".".join(self.prerelease)
+        return text
+
+
+def is_newer_version(latest, local):
+    """latest가 local보다 새 버전인지 (해석할 수 없는 버전이면 업데이트하지 않음)"""
+    latest_v = Version.parse(latest)
+    local_v = Version.parse(local)
+    if latest_v is None or local_v is None:
+        print(f"⚠️ Cannot compare versions: {latest!r} / {local!r}")
+        return False
+    return latest_v > local_v
+
+
+def select_release(releases, channel="stable"):
+    """릴리스 목록에서 채널에 맞는 가장 높은 버전 선택
+
+    stable 채널은 pre-release(GitHub prerelease 표시 또는 1.2-beta 같은 태그)를 건너뜀
+    """
+    if isinstance(releases, dict):
+        releases = [releases]
+    best = None
+    best_version = None
+    for release in releases:
+        if release.get("draft"):
+            continue
+        version = Version.parse(release.get("tag_name", ""))
+        if version is None:
+            continue
+        if channel != "beta" and (release.get("prerelease") or version.is_prerelease):
+            continue
+        if best_version is None or version > best_version:
+            best, best_version = release, version
+    return best
+
+
+def select_asset(release, pattern=r"\.exe$", preferred_name=None):
+    """릴리스에서 설치할 실행 파일 asset 선택 (없으면 None)
+
+    pattern에 맞는 asset이 여러 개면 preferred_name(현재 실행 파일 이름)과 같은 것을 우선함
+    """
+    regex = re.compile(pattern, re.IGNORECASE)
+    candidates = [a for a in (release or {}).get("assets", []) if regex.search(a.get("name", ""))]
+    if not candidates:
+        return None
+    if preferred_name:
+        for asset in candidates:
+            if asset["name"].lower() == preferred_name.lower():
+                return asset
+    return candidates[0]
+
+
+class ReleaseRateLimited(Exception):
+    """GitHub API 호출 한도 초과 (retry_after초 뒤에 다시 시도)"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"API 호출 한도 초과, {int(retry_after)}초 후 재시도")
+        self.retry_after = retry_after
+
+
+def load_update_config():
+    """%APPDATA%\\CoolMessengerHelper\\update.json 설정 (없으면 빈 설정)
+
+    channel: "stable"(기본) 또는 "beta" (beta는 pre-release도 설치)
+    asset_pattern: 설치할 asset 이름 정규식 (기본 \\.exe$)
+    mirror_url: 릴리스 정보를 먼저 받아볼 LAN 미러 (http 주소 또는 공유 폴더의 json 파일 경로)
+    publish_path: GitHub에서 새 릴리스 정보를 받으면 이 경로에 써서 다른 PC의 미러로 제공
+    """
+    try:
+        with open(os.path.join(get_app_data_dir(), "update.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class ReleaseInfoCache:
+    """최신 릴리스 정보 캐시 (디스크에 저장, 조건부 요청 사용)
+
+    ETag/Last-Modified를 저장해두고 If-None-Match/If-Modified-Since로 요청하므로
+    바뀐 것이 없으면 304 응답만 받음 (GitHub은 304 응답을 호출 한도에 세지 않음)
+    mirror_url이 있으면 먼저 미러에서 받아보고, 실패하면 GitHub에 요청함
+    """
+
+    def __init__(self, url=None, cache_path=None, mirror_url=None, publish_path=None, timeout=10):
+        self.url = url or f"https://api.github.com/repos/{REPO}/releases/latest"
+        self.cache_path = cache_path or os.path.join(get_app_data_dir(), "release_cache.json")
+        self.mirror_url = mirror_url
+        self.publish_path = publish_path
+        self.timeout = timeout
+        self.requests_made = 0
+        self.not_modified = 0
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if isinstance(state, dict):
+                return state
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _save(self):
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def get(self, max_age=0):
+        """최신 릴리스 정보 (max_age초 안에 확인한 적이 있으면 요청 없이 캐시 사용)"""
+        release = self.state.get("release")
+        if release and max_age and time.time() - self.state.get("checked_at", 0) < max_age:
+            return release
+        if self.mirror_url:
+            try:
+                return self._fetch_mirror()
+            except Exception as e:
+                print(f"업데이트 미러 사용 실패, GitHub으로 요청: {e}")
+        return self._fetch(self.url, "github")
+
+    def _fetch_mirror(self):
+        if "://" not in self.mirror_url:
+            # 공유 폴더의 json 파일
+            with open(self.mirror_url, "r", encoding="utf-8") as f:
+                release = json.load(f)
+            self._store(release, "mirror", None, None)
+            return release
+        return self._fetch(self.mirror_url, "mirror")
+
+    def _fetch(self, url, source):
+        headers = {"Accept": "application/vnd.github.v3+json"}
+        if self.state.get("release") and self.state.get("url") == url:
+            if self.state.get("etag"):
+                headers["If-None-Match"] = self.state["etag"]
+            if self.state.get("last_modified"):
+                headers["If-Modified-Since"] = self.state["last_modified"]
+
+        self.requests_made += 1
+        import requests
+
+        r = requests.get(url, headers=headers, timeout=self.timeout)
+        if r.status_code == 304:
+            self.not_modified += 1
+            self.state["checked_at"] = time.time()
+            self._save()
+            return self.state["release"]
+
+        retry_after = self._rate_limit_delay(r)
+        if retry_after is not None:
+            raise ReleaseRateLimited(retry_after)
+        r.raise_for_status()
+
+        release = r.json()
+        self.state["url"] = url
+        self._store(release, source, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        if source == "github" and self.publish_path:
+            self._publish(release)
+        return release
+
+    def _store(self, release, source, etag, last_modified):
+        self.state.update({
+            "release": release,
+            "source": source,
+            "etag": etag,
+            "last_modified": last_modified,
+            "checked_at": time.time(),
+        })
+        self._save()
+
+    def _publish(self, release):
+        try:
+            tmp_path = self.publish_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(release, f)
+            os.replace(tmp_path, self.publish_path)
+        except OSError as e:
+            print(f"릴리스 정보 미러 게시 실패: {e}")
+
+    @staticmethod
+    def _rate_limit_delay(response):
+        """호출 한도 초과 응답이면 기다릴 초, 아니면 None"""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = response.headers.get("X-RateLimit-Reset", "")
+            if reset.isdigit():
+                return max(int(reset) - time.time(), 1)
+            return 3600
+        return 60 if response.status_code == 429 else None
+
+
+class UpdateCheckSchedule:
+    """업데이트 확인 간격 (지터 + 오류/호출 한도 백오프)
+
+    같은 NAT 뒤의 PC들이 동시에 요청하지 않도록 매 간격에 ±jitter 비율의 무작위 오차를 줌
+    """
+
+    def __init__(self, interval=300, jitter=0.2, max_backoff=6 * 3600, rng=random.random):
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.rng = rng
+        self.failures = 0
+
+    def _jittered(self, delay):
+        return delay * (1 + self.jitter * (2 * self.rng() - 1))
+
+    def initial_delay(self):
+        """로그인 직후 동시에 몰리지 않도록 첫 확인을 0~interval 사이로 분산"""
+        return self.interval * self.rng()
+
+    def on_success(self):
+        self.failures = 0
+        return self._jittered(self.interval)
+
+    def on_error(self):
+        self.failures += 1
+        return self._jittered(min(self.interval * (2 ** self.failures), self.max_backoff))
+
+    def on_rate_limited(self, retry_after):
+        self.failures += 1
+        return max(retry_after, self.interval) + self.interval * self.jitter * self.rng()
+
+
+_release_caches = {}
+
+def get_release_cache(channel="stable"):
+    """채널별 릴리스 정보 캐시 (beta는 /releases 목록, stable은 /releases/latest)"""
+    if channel not in _release_caches:
+        config = load_update_config()
+        if channel == "beta":
+            url = f"https://api.github.com/repos/{REPO}/releases?per_page=20"
+            cache_path = os.path.join(get_app_data_dir(), "release_cache_beta.json")
+        else:
+            url = None
+            cache_path = None
+        _release_caches[channel] = ReleaseInfoCache(url=url, cache_path=cache_path,
+                                                    mirror_url=config.get("mirror_url"),
+                                                    publish_path=config.get("publish_path"))
+    return _release_caches[channel]
+
+def get_update_channel():
+    return "beta" if load_update_config().get("channel") == "beta" else "stable"
+
+def get_latest_release_info(max_age=0, channel=None):
+    """채널에 맞는 최신 릴리스 정보 가져오기 (조건부 요청 캐시 사용, 없으면 None)"""
+    channel = channel or get_update_channel()
+    return select_release(get_release_cache(channel).get(max_age), channel)
+
+def get_update_asset(release):
+    """릴리스에서 내려받을 실행 파일 asset (설정의 asset_pattern 사용)"""
+    pattern = load_update_config().get("asset_pattern") or r"\.exe$"
+    return select_asset(release, pattern, os.path.basename(sys.executable))
 
 def check_and_update_with_gui(parent_window):
     """GUI와 함께 업데이트 확인 및 진행"""
@@ -977,132 +5000,94 @@ def check_and_update_with_gui(parent_window):
         try:
             local_version = get_local_version()
             if not local_version:
-                update_dialog.complete(False, "현재 버전을 확인할 수 없습니다.")
+                update_dialog.post(update_dialog.complete, False, "현재 버전을 확인할 수 없습니다.")
                 return
 
-            update_dialog.set_status("최신 버전 확인 중...")
+            update_dialog.post(update_dialog.set_status, "최신 버전 확인 중...")
 
             try:
                 release = get_latest_release_info()
+                if release is None:
+                    update_dialog.post(update_dialog.complete, False, "릴리스 정보를 찾을 수 없습니다.")
+                    return
                 latest_version = release["tag_name"].lstrip("v")
-                update_dialog.set_version_info(local_version, latest_version)
+                update_dialog.post(update_dialog.set_version_info, local_version, latest_version)
 
-                if latest_version <= local_version:
-                    update_dialog.complete(True, "이미 최신 버전을 사용 중입니다.")
+                if not is_newer_version(latest_version, local_version):
+                    update_dialog.post(update_dialog.complete, True, "이미 최신 버전을 사용 중입니다.")
                     return
 
-                try:
-                    asset = next(a for a in release["assets"] if a["name"].endswith(".exe"))
-                    download_url = asset["browser_download_url"]
-                    update_dialog.cancel_button.config(text="취소")
-                    update_dialog.set_status("업데이트를 시작합니다")
-                    start_download(download_url)
-                except StopIteration:
-                    update_dialog.complete(False, "다운로드 파일을 찾을 수 없습니다.")
+                asset = get_update_asset(release)
+                if asset is None:
+                    update_dialog.post(update_dialog.complete, False, "다운로드 파일을 찾을 수 없습니다.")
+                    return
+                update_dialog.post(update_dialog.cancel_button.config, {"text": "취소"})
+                update_dialog.post(update_dialog.set_status, "업데이트를 시작합니다")
+                start_download(asset)
             except Exception as e:
-                update_dialog.complete(False, f"업데이트 확인 실패: {str(e)}")
+                update_dialog.post(update_dialog.complete, False, f"업데이트 확인 실패: {str(e)}")
                 return
 
         except Exception as e:
-            update_dialog.complete(False, f"오류 발생: {str(e)}")
-    def start_download(download_url):
-        update_dialog.set_status("업데이트 다운로드 중...")
-        
-        # 안전한 임시 파일 경로 생성
+            update_dialog.post(update_dialog.complete, False, f"오류 발생: {str(e)}")
+    def start_download(asset):
+        update_dialog.post(update_dialog.set_status, "업데이트 다운로드 중...")
+
+        exe_path = sys.executable
+        if not getattr(sys, "frozen", False):
+            update_dialog.post(update_dialog.complete, False, "실행 파일(exe)로 실행 중일 때만 업데이트할 수 있습니다.")
+            return
+
+        # 앱 데이터 폴더에 받아서 rename으로 교체 (exe가 시작프로그램 폴더에 있어도 임시 파일이 남지 않도록)
+        # 시작프로그램 폴더도 %APPDATA% 아래이므로 보통 같은 볼륨 안의 rename이 됨
+        exe_dir = os.path.dirname(exe_path)
+        exe_filename = os.path.basename(exe_path)
         try:
-            # 임시 디렉토리에 고유한 파일명으로 생성
-            temp_dir = tempfile.gettempdir()
-            exe_filename = os.path.basename(sys.executable)
-            tmp_exe = os.path.join(temp_dir, f"update_{exe_filename}")
-            
-            # 파일이 이미 있다면 삭제
-            if os.path.exists(tmp_exe):
-                os.remove(tmp_exe)
+            stage_dir = get_app_data_dir()
+        except OSError:
+            import tempfile
+            stage_dir = tempfile.gettempdir()
+        staged_exe = os.path.join(stage_dir, f".update_{asset.get('id', '')}_{exe_filename}")
+        try:
+            # 파일이 이미 있다면 삭제 (같은 버전의 .part는 이어받기용으로 남겨둠)
+            if os.path.exists(staged_exe):
+                os.remove(staged_exe)
         except Exception as e:
-            update_dialog.complete(False, f"임시 파일 생성 실패: {str(e)}")
+            update_dialog.post(update_dialog.complete, False, f"임시 파일 생성 실패: {str(e)}")
             return
-        
+
         # 진행 상태와 함께 다운로드
-        success = download_with_progress(download_url, tmp_exe, update_dialog)
-        
+        timings = {}
+        started = time.perf_counter()
+        success = download_with_progress(asset["browser_download_url"], staged_exe, update_dialog,
+                                         expected_size=asset.get("size"), expected_digest=asset.get("digest"))
+        timings["download"] = time.perf_counter() - started
+
         if not success or update_dialog.cancelled:
             if not update_dialog.cancelled:
-                update_dialog.complete(False, "다운로드에 실패했습니다.")
-            # 임시 파일 정리
-            if os.path.exists(tmp_exe):
-                try:
-                    os.remove(tmp_exe)
-                except:
-                    pass
-            return
-        
-        update_dialog.set_status("업데이트 설치 준비 중...")
-        ## 업데이트 ##
-        exe_path = sys.executable
-        current_pid = os.getpid()
-
-        mei_path = getattr(sys, "_MEIPASS", None)
-        if mei_path is None or not os.path.isdir(mei_path):
-            print("Not running from PyInstaller context. Aborting.")
+                update_dialog.post(update_dialog.complete, False, "다운로드에 실패했습니다.")
             return
 
-        # 백업할 경로
-        mei_backup = os.path.join(tempfile.gettempdir(), "_MEI_backup")
-        if os.path.exists(mei_backup):
-            shutil.rmtree(mei_backup)
-        shutil.copytree(mei_path, mei_backup)
+        update_dialog.post(update_dialog.set_status, "업데이트 설치 중...")
+        release = get_latest_release_info(max_age=600)
+        latest_version = release["tag_name"].lstrip("v") if release else None
 
-        print(f"Backed up MEI folder from:\n  {mei_path}\nto:\n  {mei_backup}")
+        # onefile exe는 부트로더(부모)와 파이썬(자식) 두 프로세스가 exe를 잡고 있으므로 둘 다 기다림
+        pids = [os.getpid()]
+        if hasattr(os, "getppid"):
+            pids.append(os.getppid())
 
-        # 원래 MEI 폴더 이름만 추출 (_MEIxxxxx)
-        mei_name = os.path.basename(mei_path)
-        mei_original_path = os.path.join(tempfile.gettempdir(), mei_name)
-
-        # 버전 파일 수정하기
-        release = get_latest_release_info()
-        latest_version = release["tag_name"].lstrip("v")
-
-        
-        # version_path = os.path.join(mei_backup, "version.txt")
-        # with open(version_path, "w", encoding="utf-8") as f:
-        #     f.write(latest_version)
-
-        # 배치 파일 경로
-        bat_path = os.path.join(tempfile.gettempdir(), "update_restore_run.bat")
-
-        bat_script = f"""@echo off
-    echo Waiting for PID {current_pid} to exit...
-    timeout /t 2 >nul
-    taskkill /PID {current_pid} /F
-
-    timeout /t 2 >nul
-
-    echo Restoring {mei_name}...
-    rmdir /s /q "{mei_original_path}" >nul 2>&1
-    xcopy /e /i /y "{mei_backup}" "{mei_original_path}"
-
-    echo Writing version.txt...
-    echo {latest_version} > "{os.path.join(mei_backup, "version.txt")}"
-
-    echo Replacing exe...
-    del "{exe_path}" >nul 2>&1
-    copy "{tmp_exe}" "{exe_path}" >nul
-
-    echo Starting new exe...
-    start "" "{exe_path}"
-
-    echo Cleaning up...
-    rmdir /s /q "{mei_backup}" >nul 2>&1
-
-    del "%~f0"
-    """
-
-        with open(bat_path, "w", encoding="utf-8") as f:
-            f.write(bat_script)
+        plan = build_update_plan(exe_path, staged_exe, latest_version, pids,
+                                 version_file_exists=os.path.exists(os.path.join(exe_dir, "version.txt")))
+        try:
+            run_update_plan(plan, timings)
+        except Exception as e:
+            update_dialog.post(update_dialog.complete, False, f"업데이트 설치 실패: {str(e)}")
+            return
+        record_update_timing(timings, latest_version or "unknown")
 
-        print(f"Batch script written to:\n  {bat_path}")
-        subprocess.Popen(["cmd", "/c", bat_path], creationflags=subprocess.CREATE_NO_WINDOW)
-        sys.exit()
+        # 새 exe가 실행되었으므로 GUI를 닫아 현재 프로세스를 정상 종료
+        parent_window.after(0, parent_window.destroy)
 
     # 별도 스레드에서 업데이트 확인 실행
     threading.Thread(target=run_update, daemon=True).start()
@@ -1118,22 +5103,69 @@ def check_and_update():
 
     try:
         release = get_latest_release_info()
+        if release is None:
+            print("⚠️ No release found for this channel.")
+            return
         latest_version = release["tag_name"].lstrip("v")
 
         print(f"🔍 Local version: {local_version}, Latest version: {latest_version}")
-        if latest_version <= local_version:
+        if not is_newer_version(latest_version, local_version):
             print("✅ Already up to date.")
             return
 
-        # Get asset URL (assuming .exe file)
-        asset = next(a for a in release["assets"] if a["name"].endswith(".exe"))
+        asset = get_update_asset(release)
+        if asset is None:
+            print("⚠️ No matching .exe asset in the latest release.")
+            return
         download_url = asset["browser_download_url"]
         
         print("🔄 Update available. Please use the GUI update function.")
 
     except Exception as e:
         print(f"❌ Update check failed: {e}")
+        raise
+
+LAZY_MODULES = ("requests", "tkinter.ttk", "mimetypes", "subprocess", "shutil", "tempfile")
+
+def startup_benchmark():
+    """--startup-benchmark: 시작 단계별 시간 출력 (모듈별 시간은 python -X importtime main.py --startup-benchmark)"""
+    imported = time.perf_counter()
+    gui = FileManagerGUI()
+    gui.window.update_idletasks()
+    ready = time.perf_counter()
+    gui.build_panel()
+    gui.window.update_idletasks()
+    built = time.perf_counter()
+    loaded = [name for name in LAZY_MODULES if name in sys.modules]
+    print(f"import: {(imported - _MODULE_STARTED) * 1000:.1f} ms, "
+          f"window: {(ready - imported) * 1000:.1f} ms, "
+          f"panel: {(built - ready) * 1000:.1f} ms, "
+          f"modules: {len(sys.modules)}, lazy loaded: {loaded}")
+    gui.window.destroy()
 
 if __name__ == "__main__":
-    mimetypes.init()
-    main()
\ No newline at end of file
+    if "--startup-benchmark" in sys.argv:
+        startup_benchmark()
+        sys.exit()
+    if "--title-benchmark" in sys.argv:
+        print(json.dumps(benchmark_title_matcher(), indent=2))
+        sys.exit()
+    if "--scan-benchmark" in sys.argv:
+        print(json.dumps(benchmark_scan(), indent=2))
+        sys.exit()
+    if "--list-benchmark" in sys.argv:
+        print(json.dumps(benchmark_file_list(), indent=2))
+        sys.exit()
+    if "--label-benchmark" in sys.argv:
+        print(json.dumps(benchmark_label_parser(), indent=2))
+        sys.exit()
+    if "--ipc-latency" in sys.argv:
+        print(json.dumps(measure_ipc_latency(listen_seconds=10.0), indent=2))
+        sys.exit()
+    if "--finish-update" in sys.argv:
+        cleanup_args = sys.argv[sys.argv.index("--finish-update") + 1:]
+        threading.Thread(target=finish_update, args=(cleanup_args,), daemon=True).start()
+    if "--headless" in sys.argv:
+        run_headless()
+    else:
+        main(attach="--attach" in sys.argv)
\ No newline at end of file
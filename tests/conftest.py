@@ -0,0 +1,50 @@
+import os
+import sys
+
+# main.py는 저장소 최상위의 단일 모듈이므로 테스트에서 바로 import할 수 있게 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        status, headers, body = self.server.respond(self)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if "Content-Length" not in headers:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """로컬 HTTP 서버: start(respond) - respond(handler)가 (상태 코드, 헤더, 본문)을 돌려줌
+
+    서버의 url과 받은 요청 헤더 목록(requests)을 확인할 수 있음
+    """
+    servers = []
+
+    def start(respond):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        server.daemon_threads = True
+        server.respond = respond
+        server.requests = []
+        server.url = f"http://127.0.0.1:{server.server_port}/file"
+        threading.Thread(target=server.serve_forever, args=(0.02,), daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
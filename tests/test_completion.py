@@ -0,0 +1,79 @@
+import pytest
+
+from main import (DOWNLOAD_ACTIVE, DOWNLOAD_COMPLETE, DOWNLOAD_INCOMPLETE, DownloadCompletionTracker,
+                  DownloadIndex, parse_attachment_label)
+
+GB = 1024 ** 3
+MB = 1024 ** 2
+
+
+@pytest.mark.parametrize("text, tolerance", [
+    ("영상.mp4 (1 GB)", int(GB * 0.05)),
+    ("영상.mp4 (1.05 GB)", GB // 200),
+    ("수업자료 모음.zip (120 MB)", MB // 2),
+    ("report_final(수정).docx (88 KB)", 512),
+    ("빈 파일.txt (0 KB)", 512),
+])
+def test_label_tolerance_is_capped(text, tolerance):
+    assert parse_attachment_label(text).tolerance == tolerance
+
+
+def test_one_gb_label_does_not_accept_half_a_gigabyte():
+    label = parse_attachment_label("영상.mp4 (1 GB)")
+    assert not label.matches(GB - 300 * MB)
+    assert label.matches(GB - 20 * MB)
+    # 1000 단위로 표시한 경우 (1,000,000,000 바이트)
+    assert label.matches(10 ** 9)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    index = DownloadIndex(str(tmp_path))
+    index.scan()
+    clock = Clock()
+    locked = set()
+    tracker = DownloadCompletionTracker(index, clock=clock, is_locked=lambda path: path in locked)
+    tracker.expect([parse_attachment_label("영상.mp4 (1 MB)")])
+    return tracker, index, tmp_path, clock, locked
+
+
+def write(index, path, size):
+    path.write_bytes(b"x" * size)
+    index.refresh([path.name])
+
+
+def test_within_tolerance_waits_for_writer_to_close(tracker):
+    tracker, index, folder, clock, locked = tracker
+    path = folder / "영상.mp4"
+    locked.add(str(path))
+    write(index, path, MB - 20 * 1024)
+    clock.now += 5
+    assert tracker.progress("영상.mp4").state == DOWNLOAD_ACTIVE
+
+    locked.clear()
+    assert tracker.progress("영상.mp4").state == DOWNLOAD_COMPLETE
+
+
+def test_at_label_size_completes_even_if_locked(tracker):
+    tracker, index, folder, clock, locked = tracker
+    path = folder / "영상.mp4"
+    locked.add(str(path))
+    write(index, path, MB)
+    assert tracker.progress("영상.mp4").state == DOWNLOAD_ACTIVE
+    clock.now += tracker.settle
+    assert tracker.progress("영상.mp4").state == DOWNLOAD_COMPLETE
+
+
+def test_short_file_becomes_incomplete_after_stall(tracker):
+    tracker, index, folder, clock, locked = tracker
+    write(index, folder / "영상.mp4", MB // 2)
+    clock.now += tracker.stall
+    assert tracker.progress("영상.mp4").state == DOWNLOAD_INCOMPLETE
@@ -0,0 +1,97 @@
+import hashlib
+import os
+
+import pytest
+
+from main import UpdateDownloader
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MB
+DIGEST = "sha256:" + hashlib.sha256(PAYLOAD).hexdigest()
+
+
+def ranged(handler):
+    """Range를 지원하는 서버"""
+    header = handler.headers.get("Range")
+    if not header:
+        return 200, {}, PAYLOAD
+    start = int(header.split("=")[1].rstrip("-"))
+    if start >= len(PAYLOAD):
+        return 416, {"Content-Range": f"bytes */{len(PAYLOAD)}"}, b""
+    return 206, {"Content-Range": f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}"}, PAYLOAD[start:]
+
+
+def ignores_range(handler):
+    return 200, {}, PAYLOAD
+
+
+def downloader(server, path, **kwargs):
+    return UpdateDownloader(server.url, str(path), progress_interval=0, retries=2, timeout=5, **kwargs)
+
+
+def test_resumes_partial_download_with_range(stub_server, tmp_path):
+    server = stub_server(ranged)
+    path = tmp_path / "update.exe"
+    (tmp_path / "update.exe.part").write_bytes(PAYLOAD[:300000])
+    reports = []
+
+    d = downloader(server, path, expected_size=len(PAYLOAD), expected_digest=DIGEST,
+                   progress=lambda done, total: reports.append((done, total)))
+    assert d.run()
+    assert server.requests[0]["Range"] == "bytes=300000-"
+    assert d.resumed_from == 300000
+    assert reports[0] == (300000, len(PAYLOAD)) and reports[-1] == (len(PAYLOAD), len(PAYLOAD))
+    assert path.read_bytes() == PAYLOAD
+    assert not (tmp_path / "update.exe.part").exists()
+
+
+def test_restarts_when_server_ignores_range(stub_server, tmp_path):
+    server = stub_server(ignores_range)
+    path = tmp_path / "update.exe"
+    (tmp_path / "update.exe.part").write_bytes(PAYLOAD[:300000])
+
+    d = downloader(server, path, expected_size=len(PAYLOAD), expected_digest=DIGEST)
+    assert d.run()
+    assert server.requests[0]["Range"] == "bytes=300000-"
+    assert d.resumed_from == 0
+    # 200 응답은 처음부터 다시 쓴 것이어야 함 (이어 붙이면 크기가 커짐)
+    assert path.read_bytes() == PAYLOAD
+
+
+def test_416_means_part_file_is_already_complete(stub_server, tmp_path):
+    server = stub_server(ranged)
+    path = tmp_path / "update.exe"
+    (tmp_path / "update.exe.part").write_bytes(PAYLOAD)
+
+    # 크기를 모르면 416 응답으로 이미 다 받았음을 알게 되고, 해시로 검증함
+    d = downloader(server, path, expected_digest=DIGEST)
+    assert d.run()
+    assert server.requests[0]["Range"] == f"bytes={len(PAYLOAD)}-"
+    assert path.read_bytes() == PAYLOAD
+
+
+def test_416_with_bad_part_file_is_discarded(stub_server, tmp_path):
+    server = stub_server(ranged)
+    path = tmp_path / "update.exe"
+    (tmp_path / "update.exe.part").write_bytes(b"x" * len(PAYLOAD))
+
+    d = downloader(server, path, expected_digest=DIGEST)
+    assert d.run()
+    # 검증 실패로 .part를 지우고 처음부터 다시 받음
+    assert d.verify_failures == 1
+    assert "Range" not in server.requests[1]
+    assert path.read_bytes() == PAYLOAD
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"expected_size": len(PAYLOAD) + 1},
+    {"expected_digest": "sha256:" + "0" * 64},
+])
+def test_mismatch_deletes_part_file(stub_server, tmp_path, kwargs):
+    server = stub_server(ignores_range)
+    path = tmp_path / "update.exe"
+
+    d = downloader(server, path, **kwargs)
+    assert not d.run()
+    assert d.verify_failures == 2
+    assert not os.path.exists(str(path) + ".part")
+    assert not path.exists()
@@ -0,0 +1,58 @@
+import os
+import time
+
+import pytest
+
+from main import DownloadIndex, DuplicateFinder
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+@pytest.fixture
+def finder(tmp_path):
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    (downloads / "보고서.hwp").write_bytes(b"A" * 100000)
+    (downloads / "보고서 (1).hwp").write_bytes(b"A" * 100000)
+    os.utime(downloads / "보고서.hwp", (time.time() - 60, time.time() - 60))
+    index = DownloadIndex(str(downloads))
+    index.scan()
+    finder = DuplicateFinder(index, db_path=str(tmp_path / "hashes.db"), max_rate=1 << 40, settle_delay=0.0)
+    finder.start()
+    assert wait_for(lambda: finder.original_of("보고서 (1).hwp") == "보고서.hwp")
+    return finder, downloads
+
+
+def test_remove_duplicate(finder):
+    finder, downloads = finder
+    assert finder.remove_duplicate("보고서 (1).hwp")
+    assert not (downloads / "보고서 (1).hwp").exists()
+    assert (downloads / "보고서.hwp").exists()
+
+
+def test_modified_duplicate_is_not_removed(finder):
+    finder, downloads = finder
+    # 해시한 뒤 같은 크기의 다른 내용으로 다시 받아짐 (인덱스 알림 전)
+    (downloads / "보고서 (1).hwp").write_bytes(b"A" * 99999 + b"B")
+
+    assert not finder.remove_duplicate("보고서 (1).hwp")
+    assert (downloads / "보고서 (1).hwp").read_bytes().endswith(b"B")
+    # 감시 스레드가 바뀐 크기/시각을 알리면 다시 해시해 중복 표시가 사라짐
+    finder.download_index.scan()
+    assert wait_for(lambda: finder.original_of("보고서 (1).hwp") is None)
+
+
+def test_modified_original_is_not_linked(finder):
+    finder, downloads = finder
+    (downloads / "보고서.hwp").write_bytes(b"C" * 100000)
+
+    assert not finder.link_duplicate("보고서 (1).hwp")
+    assert (downloads / "보고서 (1).hwp").read_bytes() == b"A" * 100000
+    assert not os.path.samefile(downloads / "보고서.hwp", downloads / "보고서 (1).hwp")
@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from main import AttachmentHistory
+
+
+ROWS = [
+    ("2024학년도 가정통신문(3월).pdf", "(1.2 MB)", "1학년 공지", 1.0, r"C:\다운로드\2024학년도 가정통신문(3월).pdf"),
+    ("수업자료모음.zip", "(35 MB)", "교과협의회", 2.0, r"D:\예전폴더\수업자료모음.zip"),
+    ("Report_final.hwp", "(80 KB)", "교무실", 3.0, r"C:\다운로드\Report_final.hwp"),
+]
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = AttachmentHistory(path=str(tmp_path / "history.db"))
+    history.write_batch(ROWS)
+    return history
+
+
+def names(rows):
+    return [row[0] for row in rows]
+
+
+def test_uses_trigram_index(history):
+    assert history.fts
+
+
+def test_korean_infix_match(history):
+    assert names(history.search("통신문")) == ["2024학년도 가정통신문(3월).pdf"]
+    assert names(history.search("업자료")) == ["수업자료모음.zip"]
+
+
+def test_short_terms_use_like_fallback(history):
+    assert names(history.search("자료")) == ["수업자료모음.zip"]
+    assert names(history.search("3월")) == ["2024학년도 가정통신문(3월).pdf"]
+    assert names(history.search("교무")) == ["Report_final.hwp"]
+
+
+def test_mixed_terms_and_case(history):
+    assert names(history.search("report FINAL")) == ["Report_final.hwp"]
+    assert names(history.search("가정 통신문")) == ["2024학년도 가정통신문(3월).pdf"]
+    assert history.search("없는파일") == []
+
+
+def test_search_returns_recorded_path(history):
+    row = history.search("수업자료")[0]
+    assert row[4] == r"D:\예전폴더\수업자료모음.zip"
+
+
+def test_migrates_old_unicode61_index(tmp_path):
+    path = str(tmp_path / "history.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(AttachmentHistory.SCHEMA)
+    conn.executescript("""
+        CREATE VIRTUAL TABLE attachments_fts USING fts5(
+            filename, window_title, content='attachments', content_rowid='id', prefix='1 2 3'
+        );
+    """)
+    conn.executemany("INSERT INTO attachments (filename, size_text, window_title, first_seen, download_path) "
+                     "VALUES (?, ?, ?, ?, ?)", ROWS)
+    conn.commit()
+    conn.close()
+
+    history = AttachmentHistory(path=path)
+    assert names(history.search("통신문")) == ["2024학년도 가정통신문(3월).pdf"]
+    tables = {row[0] for row in history._connect().execute("SELECT name FROM sqlite_master")}
+    assert "attachments_fts" not in tables
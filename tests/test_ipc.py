@@ -0,0 +1,97 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from main import UI_STATUS, UiUpdateQueue, WatcherIpcClient, WatcherIpcServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    info_path = str(tmp_path / "daemon.json")
+    server = WatcherIpcServer(UiUpdateQueue(), info_path=info_path, auth_timeout=0.5)
+    server.start()
+    yield server
+    server.stop()
+
+
+def connect(server):
+    conn = socket.create_connection(("127.0.0.1", server.port), timeout=3.0)
+    return conn, conn.makefile("rb")
+
+
+def test_token_is_written_to_daemon_info(server):
+    with open(server.info_path, encoding="utf-8") as f:
+        info = json.load(f)
+    assert info["port"] == server.port
+    assert info["token"] == server.token and len(server.token) >= 32
+
+
+@pytest.mark.parametrize("first_line", [
+    {"cmd": "search", "query": "가정통신문"},
+    {"cmd": "rescan"},
+    {"cmd": "hello", "token": "wrong"},
+    {"cmd": "hello"},
+])
+def test_commands_before_hello_are_rejected(server, first_line):
+    conn, reader = connect(server)
+    conn.sendall((json.dumps(first_line) + "\n").encode("utf-8"))
+    assert json.loads(reader.readline()) == {"type": "error", "error": "unauthorized"}
+    assert reader.readline() == b""
+    conn.close()
+
+
+def test_silent_connection_is_closed(server):
+    conn, reader = connect(server)
+    assert reader.readline() == b""
+    assert server.rejected == 1
+    conn.close()
+
+
+def test_client_authenticates_from_daemon_info(server):
+    client = WatcherIpcClient(info_path=server.info_path, timeout=3.0)
+    assert client.receive()["type"] == "state"
+    assert client.request("ping", ts=1)["type"] == "pong"
+    server.ui_queue.publish(UI_STATUS, "확인")
+    message = client.receive()
+    assert (message["type"], message["kind"], message["payload"]) == ("event", UI_STATUS, "확인")
+    client.close()
+
+
+def test_concurrent_replies_and_broadcasts_do_not_interleave(server):
+    client = WatcherIpcClient(info_path=server.info_path, timeout=5.0)
+    assert client.receive()["type"] == "state"
+    # 작은 송신 버퍼로 큰 방송이 여러 번에 나뉘어 보내지게 함 (그 사이에 응답이 끼어들 수 있는 상황)
+    for conn in server.clients:
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 16384)
+    big = "가" * 200000
+    pings = 2000
+
+    def publish():
+        for i in range(30):
+            server.ui_queue.publish(UI_STATUS, f"{i}:{big}")
+            time.sleep(0.005)
+
+    def ping():
+        for i in range(pings):
+            client.send("ping", ts=i)
+
+    threads = [threading.Thread(target=publish), threading.Thread(target=ping)]
+    for thread in threads:
+        thread.start()
+    pongs = 0
+    statuses = 0
+    while pongs < pings or not statuses:
+        # 메시지 경계가 섞였다면 JSON 해석에서 실패함
+        message = client.receive()
+        if message["type"] == "pong":
+            assert message["ts"] == pongs
+            pongs += 1
+        elif message["type"] == "event":
+            assert message["payload"].endswith(big)
+            statuses += 1
+    for thread in threads:
+        thread.join()
+    client.close()
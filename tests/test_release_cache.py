@@ -0,0 +1,133 @@
+import json
+import time
+
+import pytest
+import requests
+
+from main import ReleaseInfoCache, ReleaseRateLimited, UpdateCheckSchedule
+
+RELEASE = {"tag_name": "v1.4.0", "assets": []}
+NEWER = {"tag_name": "v1.5.0", "assets": []}
+
+
+def github(handler):
+    """ETag을 주고, 같은 ETag으로 물으면 304"""
+    if handler.headers.get("If-None-Match") == '"r1"':
+        return 304, {}, b""
+    return 200, {"ETag": '"r1"', "Content-Type": "application/json"}, json.dumps(RELEASE).encode()
+
+
+def unreachable(handler):
+    raise AssertionError("요청하면 안 됨")
+
+
+def make_cache(tmp_path, url, **kwargs):
+    return ReleaseInfoCache(url=url, cache_path=str(tmp_path / "release_cache.json"), timeout=5, **kwargs)
+
+
+def test_304_returns_cached_release(stub_server, tmp_path):
+    server = stub_server(github)
+    cache = make_cache(tmp_path, server.url)
+    assert cache.get() == RELEASE
+
+    # 새 프로세스처럼 디스크의 캐시에서 ETag을 읽어 조건부 요청
+    cache = make_cache(tmp_path, server.url)
+    assert cache.get() == RELEASE
+    assert server.requests[1]["If-None-Match"] == '"r1"'
+    assert cache.not_modified == 1
+
+
+def test_max_age_skips_request(stub_server, tmp_path):
+    server = stub_server(github)
+    cache = make_cache(tmp_path, server.url)
+    cache.get()
+
+    assert cache.get(max_age=600) == RELEASE
+    assert len(server.requests) == 1
+    cache.get()
+    assert len(server.requests) == 2
+
+
+def test_mirror_is_preferred(stub_server, tmp_path):
+    gh = stub_server(unreachable)
+    mirror = stub_server(lambda handler: (200, {}, json.dumps(NEWER).encode()))
+    cache = make_cache(tmp_path, gh.url, mirror_url=mirror.url)
+
+    assert cache.get() == NEWER
+    assert gh.requests == []
+    assert cache.state["source"] == "mirror"
+
+
+def test_mirror_file_is_preferred(stub_server, tmp_path):
+    gh = stub_server(unreachable)
+    mirror_path = tmp_path / "latest.json"
+    mirror_path.write_text(json.dumps(NEWER), encoding="utf-8")
+    cache = make_cache(tmp_path, gh.url, mirror_url=str(mirror_path))
+
+    assert cache.get() == NEWER
+    assert gh.requests == []
+
+
+def test_falls_back_to_github_when_mirror_fails(stub_server, tmp_path):
+    gh = stub_server(github)
+    mirror = stub_server(lambda handler: (500, {}, b""))
+    publish_path = tmp_path / "published.json"
+    cache = make_cache(tmp_path, gh.url, mirror_url=mirror.url, publish_path=str(publish_path))
+
+    assert cache.get() == RELEASE
+    assert len(mirror.requests) == 1 and len(gh.requests) == 1
+    # GitHub에서 받은 정보는 다른 PC가 미러로 쓰도록 게시됨
+    assert json.loads(publish_path.read_text(encoding="utf-8")) == RELEASE
+
+
+def test_rate_limit_remaining_zero_backs_off(stub_server, tmp_path):
+    reset = int(time.time()) + 1200
+    responses = iter([
+        (200, {"ETag": '"r1"'}, json.dumps(RELEASE).encode()),
+        (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}, b"{}"),
+    ])
+    server = stub_server(lambda handler: next(responses))
+    cache = make_cache(tmp_path, server.url)
+    cache.get()
+
+    with pytest.raises(ReleaseRateLimited) as info:
+        cache.get()
+    assert 1100 < info.value.retry_after <= 1200
+    # 한도 초과 응답이 캐시를 덮어쓰지 않음
+    assert cache.state["release"] == RELEASE
+
+    schedule = UpdateCheckSchedule(interval=300, jitter=0.2, rng=lambda: 0.5)
+    delay = schedule.on_rate_limited(info.value.retry_after)
+    assert info.value.retry_after <= delay <= info.value.retry_after + 300 * 0.2
+    assert schedule.failures == 1
+    assert schedule.on_success() == 300 and schedule.failures == 0
+
+
+@pytest.mark.parametrize("status, headers, expected", [
+    (403, {"Retry-After": "90"}, 90),
+    (429, {}, 60),
+    (403, {"X-RateLimit-Remaining": "0"}, 3600),
+])
+def test_rate_limit_delay(stub_server, tmp_path, status, headers, expected):
+    server = stub_server(lambda handler: (status, headers, b"{}"))
+    with pytest.raises(ReleaseRateLimited) as info:
+        make_cache(tmp_path, server.url).get()
+    assert info.value.retry_after == expected
+
+
+def test_plain_403_is_an_error_not_a_rate_limit(stub_server, tmp_path):
+    server = stub_server(lambda handler: (403, {"X-RateLimit-Remaining": "12"}, b"{}"))
+    with pytest.raises(requests.HTTPError):
+        make_cache(tmp_path, server.url).get()
+
+
+def test_schedule_backs_off_short_rate_limit_to_interval():
+    schedule = UpdateCheckSchedule(interval=300, jitter=0.2, rng=lambda: 0.0)
+    # Retry-After가 간격보다 짧아도 간격보다 자주 묻지 않음
+    assert schedule.on_rate_limited(5) == 300
+
+
+def test_schedule_error_backoff_is_capped():
+    schedule = UpdateCheckSchedule(interval=300, jitter=0.0, max_backoff=3600)
+    assert [schedule.on_error() for _ in range(5)] == [600, 1200, 2400, 3600, 3600]
+    assert schedule.on_success() == 300
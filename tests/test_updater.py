@@ -0,0 +1,115 @@
+import pytest
+
+from main import Version, build_launch_env, is_newer_version, select_asset, select_release
+
+
+@pytest.mark.parametrize("text, numbers, prerelease", [
+    ("1.2.3", (1, 2, 3), ()),
+    ("v1.2.3", (1, 2, 3), ()),
+    ("1.2", (1, 2), ()),
+    ("1.2.0", (1, 2), ()),
+    ("2", (2,), ()),
+    ("0.0", (0,), ()),
+    ("1.2.3-beta", (1, 2, 3), ("beta",)),
+    ("v1.2.3-Beta.2", (1, 2, 3), ("beta", "2")),
+])
+def test_parse(text, numbers, prerelease):
+    version = Version.parse(text)
+    assert version.numbers == numbers
+    assert version.prerelease == prerelease
+
+
+@pytest.mark.parametrize("text", ["", None, "latest", "v", "1..2", "beta-1.2"])
+def test_parse_invalid(text):
+    assert Version.parse(text) is None
+
+
+@pytest.mark.parametrize("lower, higher", [
+    ("1.9", "1.10"),
+    ("1.2", "1.2.1"),
+    ("1.2.3", "1.3"),
+    ("0.9.9", "1.0"),
+    ("v1.2.3", "1.2.4"),
+    ("1.2.3-beta", "1.2.3"),
+    ("1.2.3-alpha", "1.2.3-beta"),
+    ("1.2.3-beta.2", "1.2.3-beta.10"),
+    ("1.2.3-beta.9", "1.2.3-beta.rc"),
+    ("1.2.3-beta", "1.2.3-beta.1"),
+    ("1.2.3", "1.2.4-beta"),
+])
+def test_ordering(lower, higher):
+    assert Version.parse(lower) < Version.parse(higher)
+    assert Version.parse(higher) > Version.parse(lower)
+
+
+@pytest.mark.parametrize("a, b", [("1.2", "1.2.0"), ("v1.2.3", "1.2.3"), ("1.2.3-BETA", "1.2.3-beta")])
+def test_equal(a, b):
+    assert Version.parse(a) == Version.parse(b)
+    assert hash(Version.parse(a)) == hash(Version.parse(b))
+
+
+@pytest.mark.parametrize("latest, local, expected", [
+    ("1.10", "1.9", True),
+    ("1.9", "1.10", False),
+    ("v1.2.3", "1.2.3", False),
+    ("1.2.0", "1.2", False),
+    ("1.2.3", "1.2.3-beta", True),
+    ("1.2.3-beta", "1.2.2", True),
+    ("garbage", "1.0", False),
+    ("1.0", "", False),
+])
+def test_is_newer_version(latest, local, expected):
+    assert is_newer_version(latest, local) is expected
+
+
+RELEASES = [
+    {"tag_name": "v1.9.0"},
+    {"tag_name": "v1.10.0"},
+    {"tag_name": "v1.11.0-beta.1"},
+    {"tag_name": "v1.12.0", "prerelease": True},
+    {"tag_name": "v2.0.0", "draft": True},
+    {"tag_name": "nightly"},
+]
+
+
+@pytest.mark.parametrize("releases, channel, expected", [
+    (RELEASES, "stable", "v1.10.0"),
+    (RELEASES, "beta", "v1.12.0"),
+    (RELEASES[:3], "beta", "v1.11.0-beta.1"),
+    ({"tag_name": "v1.0"}, "stable", "v1.0"),
+    ([{"tag_name": "v1.1-rc.1"}], "stable", None),
+    ([], "stable", None),
+])
+def test_select_release(releases, channel, expected):
+    release = select_release(releases, channel)
+    assert (release["tag_name"] if release else None) == expected
+
+
+ASSETS = {"assets": [
+    {"name": "source.zip"},
+    {"name": "helper-setup.exe"},
+    {"name": "main.exe"},
+    {"name": "main.exe.sha256"},
+]}
+
+
+@pytest.mark.parametrize("release, pattern, preferred, expected", [
+    (ASSETS, r"\.exe$", None, "helper-setup.exe"),
+    (ASSETS, r"\.exe$", "main.exe", "main.exe"),
+    (ASSETS, r"\.exe$", "MAIN.EXE", "main.exe"),
+    (ASSETS, r"\.exe$", "other.exe", "helper-setup.exe"),
+    (ASSETS, r"^main\.exe$", None, "main.exe"),
+    (ASSETS, r"\.msi$", None, None),
+    ({"assets": []}, r"\.exe$", "main.exe", None),
+    (None, r"\.exe$", None, None),
+])
+def test_select_asset(release, pattern, preferred, expected):
+    asset = select_asset(release, pattern, preferred)
+    assert (asset["name"] if asset else None) == expected
+
+
+def test_launch_env_drops_pyinstaller_bootloader_state():
+    env = build_launch_env({"PATH": r"C:\Windows", "TEMP": r"C:\Temp", "_MEIPASS2": r"C:\Temp\_MEI123",
+                            "_PYI_APPLICATION_HOME_DIR": r"C:\Temp\_MEI123", "_PYI_ARCHIVE_FILE": "main.exe",
+                            "_PYI_PARENT_PROCESS_LEVEL": "1"})
+    assert env == {"PATH": r"C:\Windows", "TEMP": r"C:\Temp", "PYINSTALLER_RESET_ENVIRONMENT": "1"}
@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+
+from main import (EVENT_POLL, UI_FILES_CHANGED, UI_STATUS, DownloadIndex, FakeWindowBackend, MessageWatcher,
+                  PollingEventSource, PollScheduler, UiUpdateQueue, WindowEventSource, WinEventHookSource,
+                  build_fake_message_window)
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+@pytest.fixture
+def hung_window(tmp_path):
+    """멈출 수 있는 가상 메시지 창 하나를 감시 중인 watcher (감시 스레드에서 실행)"""
+    backend = FakeWindowBackend(send_timeout=0.1)
+    top = build_fake_message_window(backend, 10, depth=2)
+    backend.foreground = top
+    index = DownloadIndex(str(tmp_path))
+    index.scan()
+    ui_queue = UiUpdateQueue()
+    watcher = MessageWatcher(ui_queue, event_source=WindowEventSource(), backend=backend, download_index=index,
+                             resync_interval=0.3, scan_budget=0.5, quarantine_base=0.2, quarantine_max=1.0)
+    watcher.coordinator.timeout = 100
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+    assert wait_for(lambda: top in watcher.windows and watcher.windows[top].scans)
+    yield backend, top, watcher, ui_queue, thread
+    watcher.source.stop()
+    thread.join(2)
+
+
+def test_hung_window_is_quarantined_with_backoff(hung_window):
+    backend, top, watcher, ui_queue, thread = hung_window
+    state = watcher.windows[top]
+    filenames = list(state.filenames)
+    assert len(filenames) == 10
+    ui_queue.drain()
+
+    backend.stall(top)
+    state.need_scan = True
+    watcher.source.post(EVENT_POLL)
+    time.sleep(2.5)
+
+    events = ui_queue.drain()
+    # 0.2 -> 0.4 -> 0.8 -> 1.0초 간격으로만 다시 시도하므로 2.5초 동안 4번 안팎
+    assert 3 <= state.timeouts <= 5
+    assert thread.is_alive()
+    assert any(kind == UI_STATUS and "응답하지 않습니다" in payload for kind, payload in events)
+    # 멈춘 동안에는 마지막으로 알던 목록을 유지
+    assert not any(kind == UI_FILES_CHANGED for kind, _ in events)
+    assert state.filenames == filenames
+    assert watcher.health()[hex(top)]["timeouts"] == state.timeouts
+
+
+def test_quarantined_window_recovers_after_unstall(hung_window):
+    backend, top, watcher, ui_queue, thread = hung_window
+    state = watcher.windows[top]
+    filenames = list(state.filenames)
+
+    backend.stall(top)
+    state.need_scan = True
+    watcher.source.post(EVENT_POLL)
+    assert wait_for(lambda: state.timeouts >= 2)
+
+    backend.unstall(top)
+    assert wait_for(lambda: state.timeouts == 0, timeout=3.0)
+    assert state.quarantined_until == 0.0
+    assert state.filenames == filenames
+    health = watcher.health()[hex(top)]
+    assert health["timeouts"] == 0
+    assert health["quarantined_for"] == 0.0
+
+
+def test_slow_but_responsive_window_is_not_quarantined(hung_window):
+    backend, top, watcher, ui_queue, thread = hung_window
+    state = watcher.windows[top]
+    scans = state.scans
+
+    backend.stall(top, 0.001)
+    state.need_scan = True
+    watcher.source.post(EVENT_POLL)
+    assert wait_for(lambda: state.scans > scans)
+    backend.unstall(top)
+    assert state.timeouts == 0
+
+
+def test_vanished_control_does_not_quarantine(tmp_path):
+    backend = FakeWindowBackend(send_timeout=0.1)
+    top = build_fake_message_window(backend, 5, depth=1)
+    index = DownloadIndex(str(tmp_path))
+    index.scan()
+    watcher = MessageWatcher(UiUpdateQueue(), event_source=WindowEventSource(), backend=backend,
+                             download_index=index)
+    watcher.discover()
+    state = watcher.windows[top]
+    attachment = next(h for h, w in backend.windows.items() if w.text.startswith("첨부파일_0000"))
+
+    # 스캔 도중 첨부파일 목록이 다시 만들어져 이미 열거한 HWND가 사라짐
+    backend.remove_after_enum(attachment)
+    watcher.scan_window(state)
+
+    assert state.timeouts == 0
+    assert state.quarantined_until == 0.0
+    assert len(state.filenames) == 4
+
+
+def test_event_hooks_follow_the_messenger_process(tmp_path):
+    backend = FakeWindowBackend()
+    backend.default_pid = 777
+    top = build_fake_message_window(backend, 3, depth=1)
+    index = DownloadIndex(str(tmp_path))
+    index.scan()
+    source = WindowEventSource()
+    watcher = MessageWatcher(UiUpdateQueue(), event_source=source, backend=backend, download_index=index)
+
+    watcher.discover()
+    assert source.processes == {777}
+    # 같은 프로세스면 다시 묻지 않음
+    backend.reset_counts()
+    watcher.discover()
+    assert backend.call_counts.get("get_window_process_id", 0) == 0
+
+    backend.remove_window(top)
+    watcher.discover()
+    assert source.processes == frozenset()
+
+
+def test_hook_plan_scopes_object_events_to_tracked_process():
+    source = WinEventHookSource()
+    foreground = (source.EVENT_SYSTEM_FOREGROUND, source.EVENT_SYSTEM_FOREGROUND, 0)
+
+    untracked = source.hook_plan()
+    assert foreground in untracked
+    # 프로세스를 모를 때는 LOCATIONCHANGE(커서 이동마다 발생)를 받지 않음
+    assert all(not (low <= source.EVENT_OBJECT_LOCATIONCHANGE <= high) for low, high, _ in untracked)
+
+    tracked = source.hook_plan(frozenset({777}))
+    assert foreground in tracked
+    assert all(pid == 777 for low, high, pid in tracked if (low, high, pid) != foreground)
+    assert any(low <= source.EVENT_OBJECT_LOCATIONCHANGE <= high for low, high, _ in tracked)
+
+
+def test_polling_treats_window_move_as_change(tmp_path):
+    backend = FakeWindowBackend()
+    top = build_fake_message_window(backend, 3, depth=1)
+    backend.foreground = top
+    backend.move_window(top, (100, 100, 600, 500))
+    index = DownloadIndex(str(tmp_path))
+    index.scan()
+    scheduler = PollScheduler(min_interval=0.05, max_interval=1.0)
+    watcher = MessageWatcher(UiUpdateQueue(), event_source=PollingEventSource(0), backend=backend,
+                             download_index=index, scheduler=scheduler)
+    for _ in range(15):
+        watcher.step()
+    assert scheduler.interval == 1.0
+
+    # 창을 끄는 동안에는 매 주기가 변화이므로 가장 짧은 주기를 유지
+    for x in range(110, 160, 10):
+        backend.move_window(top, (x, 100, x + 500, 500))
+        changes = scheduler.changes
+        watcher.step()
+        assert scheduler.changes == changes + 1
+        assert scheduler.interval == 0.05
+
+    watcher.step()
+    assert scheduler.interval > 0.05